@@ -2,17 +2,11 @@ import pandas as pd
 from matplotlib.figure import Figure
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
-import matplotlib.cm as cm
 import numpy as np
 from config import CLASSIFICATION_FILE
+from spending_cube import SpendingCube, CREDIT_CATEGORIES  # noqa: F401  (CREDIT_CATEGORIES re-exported)
 
-CREDIT_CATEGORIES = {
-    "TF Revolving",
-    "TF Joint saving",
-    "TF Bills",
-    "TF Leon",
-    "TF Kate"
-}
+MAX_DATE_TICKS = 40  # Most date labels drawn on the period bar chart's x axis
 
 def assign_custom_period(df, freq=7, start_date=None):
     """
@@ -25,27 +19,66 @@ def assign_custom_period(df, freq=7, start_date=None):
     if not isinstance(freq, int) or freq <= 0:
         raise ValueError("Frequency must be a positive integer representing number of days.")
 
-    df["Period"] = (((df["Date"] - start_date).dt.days // freq) * freq).apply(
-        lambda x: start_date + pd.Timedelta(days=x)
-    )
+    # Whole-column arithmetic: integer day offsets snapped to the cycle, added back as timedeltas
+    offsets = (df["Date"] - start_date).dt.days // freq * freq
+    df["Period"] = start_date + pd.to_timedelta(offsets, unit="D")
 
     return df
 
 
-def create_spending_vs_transfer_plot(df, freq=7, start_date=None, show_credit=True):
+def period_totals(daily, freq=7, start_date=None):
+    """Sum a day-indexed frame into custom periods (see assign_custom_period); one row per period."""
+    df = assign_custom_period(daily.rename_axis("Date").reset_index(), freq=freq, start_date=start_date)
+    return df.drop(columns="Date").groupby("Period").sum()
+
+
+# --- Chart data (`data` is a SpendingCube or a classified-transactions frame throughout) ---
+
+def spending_vs_transfer_data(data, freq=7, start_date=None):
+    """Spending and Credit totals per period (both positive) and the first/last day with transactions."""
+    cube = SpendingCube.of(data)
+    days = cube.totals().index
+    daily = pd.DataFrame({
+        "Spending": cube.spending().sum(axis=1),
+        "Credit": cube.credit().sum(axis=1),
+    }).reindex(days, fill_value=0.0).fillna(0.0)
+    return period_totals(daily, freq, start_date), days.min(), days.max()
+
+
+def spending_category_data(data, freq=7, start_date=None, top_n=5):
+    """Spending per period for the top_n categories by total spend."""
+    pivot = period_totals(SpendingCube.of(data).spending(), freq=freq, start_date=start_date)
+    top_categories = pivot.sum().sort_values(ascending=False).head(top_n).index
+    return pivot[top_categories]
+
+
+def rolling_total_data(data, window=7):
+    """Daily total spending (Date, Amount) with its rolling mean over `window` spending days."""
+    daily = SpendingCube.of(data).spending().sum(axis=1).rename("Amount").rename_axis("Date").reset_index()
+    daily["Rolling"] = daily["Amount"].rolling(window=window).mean()
+    return daily
+
+
+def rolling_category_data(data, window=7, top_n=5):
+    """Rolling mean of daily spending for the top_n categories by total spend."""
+    pivot = SpendingCube.of(data).spending()
+    top_categories = pivot.sum().sort_values(ascending=False).head(top_n).index
+    return pivot[top_categories].rolling(window=window).mean()
+
+
+# --- Charts ---
+# Each chart is drawn by a draw_* function onto an existing (cleared) figure from its prepared data,
+# so a long-lived canvas can be redrawn in place; create_* builds a standalone Figure from scratch.
+
+def draw_spending_vs_transfer(fig, prepared, freq=7, start_date=None, show_credit=True):
     """
-    Create a clustered bar plot showing spending vs income/transfers over time,
+    Clustered bar plot showing spending vs income/transfers over time,
     with both categories shown as positive values for direct comparison.
+    `prepared` is the result of spending_vs_transfer_data.
     """
-    df = assign_custom_period(df, freq, start_date)
+    grouped, first_day, last_day = prepared
     title = f"Spending vs Transfers/Income Per {'Month' if freq == 30 else 'Fortnight' if freq == 14 else 'Week' if freq == 7 else 'Day'}"
 
-    df["Type"] = df["Category"].apply(lambda x: "Credit" if x in CREDIT_CATEGORIES else "Spending")
-    df["SignedAmount"] = df.apply(lambda row: row["Amount"] if row["Type"] == "Credit" else -row["Amount"], axis=1)
-
-    grouped = df.groupby(["Period", "Type"])["SignedAmount"].sum().unstack(fill_value=0)
-
-    fig = Figure(figsize=(7, 4), dpi=100)
     ax = fig.add_subplot(111)
     periods = grouped.index
     offset = freq / 6
@@ -66,50 +99,40 @@ def create_spending_vs_transfer_plot(df, freq=7, start_date=None, show_credit=Tr
     ax.grid(True)
 
      # Custom tick alignment based on start_date and rolling window
-    base = pd.to_datetime(start_date or df["Date"].min())
-    interval = freq
+    base = pd.to_datetime(start_date or first_day)
+    # Whole periods per tick, so long histories get at most MAX_DATE_TICKS labels (each costs a text render)
+    interval = freq * max(1, -(-len(pd.date_range(start=base, end=last_day, freq=f"{freq}D")) // MAX_DATE_TICKS))
 
     locator = mdates.DayLocator(interval=interval)
     ax.xaxis.set_major_locator(locator)
     ax.set_xlim(left=base)
     # Manually set tick locations if needed:
-    ticks = pd.date_range(start=base, end=df["Date"].max(), freq=f"{interval}D")
+    ticks = pd.date_range(start=base, end=last_day, freq=f"{interval}D")
     ax.set_xticks(ticks)
 
     ax.xaxis.set_major_formatter(mdates.DateFormatter("%a %d %b"))
     fig.autofmt_xdate()
 
+
+def create_spending_vs_transfer_plot(data, freq=7, start_date=None, show_credit=True):
+    fig = Figure(figsize=(7, 4), dpi=100)
+    draw_spending_vs_transfer(fig, spending_vs_transfer_data(data, freq, start_date), freq, start_date, show_credit)
     return fig
 
 
-def create_spending_category_bar_plot(df, freq=7, start_date=None, top_n=5):
+def draw_spending_category_bar(fig, pivot, freq=7):
     """
     Stacked bar chart showing spending by category over time intervals.
+    `pivot` is the result of spending_category_data (top N categories, spending as positive amounts).
     """
 
     title = f"Spending by Category Per {'Month' if freq == 30 else 'Fortnight' if freq == 14 else 'Week' if freq == 7 else 'Day'}"
-
-    df = df.copy()
-    df["Date"] = pd.to_datetime(df["Date"])
-    df["Type"] = df["Category"].apply(lambda x: "Credit" if x in CREDIT_CATEGORIES else "Spending")
-    spending = df[df["Type"] == "Spending"]
-    spending["Amount"] = -spending["Amount"]  # invert for visual consistency
-
-    # Assign period
-    spending = assign_custom_period(spending, freq=freq, start_date=start_date)
-
-    # Pivot: total amount by period/category
-    pivot = spending.pivot_table(index="Period", columns="Category", values="Amount", aggfunc="sum").fillna(0)
-
-    # Limit to top N categories
-    top_categories = pivot.sum().sort_values(ascending=False).head(top_n).index
-    pivot = pivot[top_categories]
+    top_categories = pivot.columns
 
     # Plot
-    fig = Figure(figsize=(8, 5), dpi=100)
     ax = fig.add_subplot(111)
 
-    color_map = cm.get_cmap("tab10", len(top_categories))
+    color_map = plt.get_cmap("tab10", len(top_categories))
     colors = {cat: color_map(i) for i, cat in enumerate(top_categories)}
 
     bottom = np.zeros(len(pivot))
@@ -130,23 +153,17 @@ def create_spending_category_bar_plot(df, freq=7, start_date=None, top_n=5):
     ax.legend(fontsize=8)
     fig.autofmt_xdate()
 
+
+def create_spending_category_bar_plot(data, freq=7, start_date=None, top_n=5):
+    fig = Figure(figsize=(8, 5), dpi=100)
+    draw_spending_category_bar(fig, spending_category_data(data, freq=freq, start_date=start_date, top_n=top_n), freq)
     return fig
 
 
-def create_rolling_total_plot(df, window=7, start_date=None):
+def draw_rolling_total(fig, daily, window=7):
     """
-    Line chart of total spending rolling average (single line).
+    Line chart of total spending rolling average (single line). `daily` is the result of rolling_total_data.
     """
-    df = df.copy()
-    df["Date"] = pd.to_datetime(df["Date"])
-    df["Type"] = df["Category"].apply(lambda x: "Credit" if x in CREDIT_CATEGORIES else "Spending")
-    spending = df[df["Type"] == "Spending"]
-    spending["Amount"] = -spending["Amount"]
-
-    daily = spending.groupby("Date")["Amount"].sum().reset_index()
-    daily["Rolling"] = daily["Amount"].rolling(window=window).mean()
-
-    fig = Figure(figsize=(8, 4), dpi=100)
     ax = fig.add_subplot(111)
     ax.plot(daily["Date"], daily["Rolling"], label=f"{window}-Day Avg", color="blue", linewidth=2)
     ax.set_title(f"Rolling Average of Total Spending ({window} days)")
@@ -156,33 +173,24 @@ def create_rolling_total_plot(df, window=7, start_date=None):
     fig.autofmt_xdate()
     ax.legend()
 
+
+def create_rolling_total_plot(data, window=7, start_date=None):
+    fig = Figure(figsize=(8, 4), dpi=100)
+    draw_rolling_total(fig, rolling_total_data(data, window=window), window)
     return fig
 
-def create_rolling_category_plot(df, window=7, start_date=None, top_n=5):
+
+def draw_rolling_category(fig, rolling, window=7):
     """
     Line chart of rolling average spending per category.
+    `rolling` is the result of rolling_category_data (top N categories, spending as positive amounts).
     """
-    df = df.copy()
-    df["Date"] = pd.to_datetime(df["Date"])
-    df["Type"] = df["Category"].apply(lambda x: "Credit" if x in CREDIT_CATEGORIES else "Spending")
-    spending = df[df["Type"] == "Spending"]
-    spending["Amount"] = -spending["Amount"]  # Invert for visual consistency
-
-    # Pivot to get daily totals per category
-    pivot = spending.pivot_table(index="Date", columns="Category", values="Amount", aggfunc="sum").fillna(0)
-
-    # Filter top N categories
-    top_categories = pivot.sum().sort_values(ascending=False).head(top_n).index
-    pivot = pivot[top_categories]
-
-    # Rolling averages
-    rolling = pivot.rolling(window=window).mean()
+    top_categories = rolling.columns
 
     # Plot
-    fig = Figure(figsize=(8, 5), dpi=100)
     ax = fig.add_subplot(111)
 
-    color_map = cm.get_cmap("tab10", len(top_categories))
+    color_map = plt.get_cmap("tab10", len(top_categories))
     colors = {cat: color_map(i) for i, cat in enumerate(top_categories)}
 
     for cat in top_categories:
@@ -195,6 +203,10 @@ def create_rolling_category_plot(df, window=7, start_date=None, top_n=5):
     fig.autofmt_xdate()
     ax.legend(fontsize=8)
 
+
+def create_rolling_category_plot(data, window=7, start_date=None, top_n=5):
+    fig = Figure(figsize=(8, 5), dpi=100)
+    draw_rolling_category(fig, rolling_category_data(data, window=window, top_n=top_n), window)
     return fig
 
 
@@ -257,7 +269,7 @@ def create_rolling_category_plot(df, window=7, start_date=None, top_n=5):
 #     spending = df[df["Type"] == "Spending"]
 
 #     # Daily spend by category
-#     pivot = spending.pivot_table(index="Date", columns="Category", values="Amount", aggfunc="sum").fillna(0)
+#     pivot = spending.pivot_table(index="Date", columns="Category", values="Amount", aggfunc="sum", observed=True).fillna(0)
 
 #     # Filter top N categories
 #     total_per_cat = pivot.sum().sort_values(ascending=False)
@@ -280,7 +292,7 @@ def create_rolling_category_plot(df, window=7, start_date=None, top_n=5):
 #     ax1.patch.set_visible(False)             # Hide the background of ax2
 
 
-#     color_map = cm.get_cmap("tab10", len(top_categories))
+#     color_map = plt.get_cmap("tab10", len(top_categories))
 #     colors = {cat: color_map(i) for i, cat in enumerate(top_categories)}
 
 #     # # Bars: stacked daily spend
@@ -1,44 +1,244 @@
+import numpy as np
+import pandas as pd
 from expense_classifier import ExpenseClassifier
-from fuzzy_utils import group_similar_transactions
-from utils import generate_transaction_id
-import re
-from collections import Counter
+from fuzzy_utils import group_similar_transactions, cluster_transactions, GroupQueue
+from retrain_worker import RetrainWorker
+from write_behind import WriteBehindBuffer
+from history_snapshot import HistorySnapshot
+from classification_repository import ClassificationRepository
+from ingest import load_folder
+from compact import compact_frame, memory_report, format_memory_report
+from spending_cube import SpendingCube, to_days, to_cents
+from utils import generate_transaction_ids, ensure_transaction_ids
+from text_normalization import add_normalized_columns, CLEAN_COLUMN, NORMALIZED_COLUMN
+from config import AUTO_CLASSIFY_THRESHOLD
+from perf import timed
 
 class AppController:
     def __init__(self):
         self.classifier = ExpenseClassifier()
+        self.retrain_worker = RetrainWorker(self.classifier)
+        self.write_buffer = WriteBehindBuffer(self._flush_classifications)
+        self.history = HistorySnapshot(self.classifier.store)
+        self.repository = ClassificationRepository(self.classifier, self.history)
         self.transactions = []
+        self.df = None
+        self.group_queue = None  # Clusters of the loaded file, built on first use
+        self.unclassified = None  # Boolean mask over the loaded file's rows, kept current by change events
+        self.unclassified_count = 0
+        self._uid_codes = pd.Index([])  # The file's distinct UIDs; a UID's position is its code
+        self._code_unclassified = None  # Per code: its rows are still unclassified
+        self._code_rows = None  # Row positions sorted by code; code c owns _code_rows[_code_starts[c]:_code_starts[c + 1]]
+        self._code_starts = None
+        self.file_cube = None  # Day x category totals of the loaded file, built on first use
+        self.repository.subscribe(self._mark_classified)
         # self.classifications = self.classifier.classifications
 
+    @timed("controller.load_transactions", rows=lambda self, df: len(df))
     def set_transactions_df(self, df):
-        self.df = df
+        # UIDs and normalized descriptions are computed once per file and reused everywhere;
+        # the repetitive description columns are then dictionary-encoded
+        self.df = compact_frame(add_normalized_columns(ensure_transaction_ids(df)))
+        self.group_queue = None
+        self._index_unclassified()
+
+    def _index_unclassified(self):
+        """Hash the file's UIDs against the classifications once; change events keep the mask current after that."""
+        codes, uniques = pd.factorize(self.df["UID"])
+        self._uid_codes = pd.Index(uniques)  # Hash table over the distinct UIDs, vectorized lookups
+        self._code_unclassified = ~self._uid_codes.isin(self.repository.classifications)
+        self._code_rows = np.argsort(codes, kind="stable")
+        self._code_starts = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+        self.unclassified = self._code_unclassified[codes]
+        self.unclassified_count = int(self.unclassified.sum())
+        self._file_days = to_days(self.df["Date"])
+        self._file_cents = to_cents(self.df["Amount"])
+        self.file_cube = None
+
+    def _mark_classified(self, changes):
+        # O(1) per change: every row sharing the UID flips at once (classifications are never removed)
+        for c, code in zip(changes, self._uid_codes.get_indexer([c.uid for c in changes])):
+            if code < 0:
+                continue
+            positions = self._code_rows[self._code_starts[code]:self._code_starts[code + 1]]
+            if self._code_unclassified[code]:
+                self._code_unclassified[code] = False
+                self.unclassified[positions] = False
+                self.unclassified_count -= len(positions)
+            if self.file_cube is not None:
+                old_category = c.old.get("Category") if c.old is not None else "Unclassified"
+                for day, cents in zip(self._file_days[positions], self._file_cents[positions]):
+                    if not np.isnan(cents):
+                        self.file_cube.add(day, old_category, -cents, -1)
+                        self.file_cube.add(day, c.new.get("Category"), cents)
+
+    def get_file_cube(self):
+        """Daily totals per category of the loaded file (unclassified rows under "Unclassified"), kept current by change events."""
+        if self.file_cube is None:
+            classifications = self.repository.classifications
+            self.file_cube = SpendingCube.from_frame(pd.DataFrame({
+                "Date": self.df["Date"],
+                "Amount": self.df["Amount"],
+                "Category": [classifications.get(uid, {}).get("Category", "Unclassified") for uid in self.df["UID"]],
+            }))
+        return self.file_cube
+
+    def is_in_file(self, uid):
+        return uid in self._uid_codes
+
+    @property
+    def classified_count(self):
+        """Rows of the loaded file that are classified."""
+        return 0 if self.df is None else len(self.df) - self.unclassified_count
+
+    def is_group_classified(self, rows):
+        """True once every row of a group from the loaded file is classified (looks at the group's rows only)."""
+        return not self._code_unclassified[self._uid_codes.get_indexer(rows["UID"])].any()
+
+    def load_folder(self, folder):
+        """Load every export in a folder as the working set. Returns the per-file stats."""
+        df, stats = load_folder(folder)
+        if not df.empty:
+            self.set_transactions_df(df)
+        return stats
 
     # def get_unclassified_transactions(self):
     #     classified_indices = set(map(int, self.classifier.classifications.keys()))
     #     return self.df[~self.df.index.isin(classified_indices)]
 
+    @timed("controller.get_unclassified", rows=lambda self: len(self.df))
     def get_unclassified_transactions(self):
-        classified_ids = set(self.classifier.classifications.keys())
-        return self.df[
-            ~self.df.apply(generate_transaction_id, axis=1).isin(classified_ids)
-        ]
+        return self.df[self.unclassified]
 
     # def get_grouped_transactions(self, target_row):
     #     # Assuming self.df is your DataFrame of transactions
     #     merged_rows = group_similar_transactions(self.df, target_row)
     #     return merged_rows
     
+    @timed("controller.get_grouped")
     def get_grouped_transactions(self, row):
         unclassified_df = self.get_unclassified_transactions()
         return group_similar_transactions(unclassified_df, row)
 
 
+    def get_next_group(self):
+        """
+        Similar unclassified rows to classify next, largest group first (None when all are classified).
+        The file is clustered once, on the first call after loading (i.e. after auto-classification).
+        """
+        if self.group_queue is None:
+            self.group_queue = GroupQueue(cluster_transactions(self.get_unclassified_transactions()))
+        return self.group_queue.next_group(self.df, self.unclassified)
+
     def get_prediction(self, transaction_detail):
         """Predict the expense category for a given transaction."""
         return self.classifier.predict_category(transaction_detail, top_n=2)
 
-    def save_classifications(self):
-        self.classifier.save_classifications()
+    @timed("controller.auto_classify", rows=lambda self, df=None, *a, **k: len(self.df if df is None else df))
+    def auto_classify_transactions(self, df=None, threshold=AUTO_CLASSIFY_THRESHOLD):
+        """
+        Auto-classify every unclassified row of a DataFrame in one batch prediction.
+        Rows whose top prediction meets the threshold are stored with Source 'vendor' when they
+        came from the exact-match vendor memory and 'auto' when they came from the model.
+        Returns the list of newly classified UIDs.
+        """
+        if df is None:
+            df = self.df
+
+        uids = df["UID"] if "UID" in df.columns else generate_transaction_ids(df)
+        if df is self.df:
+            unclassified = self.unclassified.copy()  # The mask changes as the accepted rows are stored
+        else:
+            unclassified = ~uids.isin(self.classifier.classifications).to_numpy()
+        if not unclassified.any():
+            return []
+
+        candidates = df[unclassified]
+        if CLEAN_COLUMN in candidates.columns:
+            predictions = self.classifier.predict_batch(candidates[CLEAN_COLUMN], top_n=1, cleaned=True)
+        else:
+            predictions = self.classifier.predict_batch(candidates["Details"], top_n=1)
+        confident = predictions["Confidence_1"].astype(float) >= threshold
+        if not confident.any():
+            return []
+
+        accepted = candidates[confident].join(predictions[confident])
+        accepted_uids = uids[accepted.index]
+        self.repository.set_many({
+            uid: {
+                "Description": details,
+                "Category": category,
+                "Source": "vendor" if source == "vendor" else "auto",
+                "Date": date,
+                "Amount": amount
+            }
+            for uid, details, category, source, date, amount in zip(
+                accepted_uids, accepted["Details"], accepted["Category_1"], accepted["Source"],
+                accepted["Date"], accepted["Amount"]
+            )
+        })
+
+        return list(accepted_uids)
+
+    def set_classification(self, uid, entry):
+        self.repository.set(uid, entry)
+
+    def subscribe(self, callback):
+        """Register for ClassificationChange batches (see ClassificationRepository)."""
+        self.repository.subscribe(callback)
+
+    def attach_scheduler(self, scheduler):
+        """Give the write-behind buffer a Tk-style after/after_cancel scheduler for debounced flushes."""
+        self.write_buffer.scheduler = scheduler
+
+    def save_classifications(self, uids=None):
+        """Queue changed UIDs for a batched write and model update (see flush_classifications)."""
+        self.write_buffer.add(uids)
+
+    def flush_classifications(self):
+        """Write pending classification changes now (group completion, window close)."""
+        return self.write_buffer.flush()
+
+    @timed("controller.save_classifications")
+    def _flush_classifications(self, uids):
+        # One disk write and one coalesced model update per batch; the history snapshot is written at close
+        self.classifier.write_classifications()
+        self.retrain_worker.request(uids)
+
+    def close(self):
+        """Flush pending writes, save the model once the last update has run and release background resources."""
+        self.flush_classifications()
+        if self.classifier.has_unsaved_changes:
+            # Rows set without a save_classifications call: persist them (the next launch trains on them)
+            self.classifier.write_classifications()
+        self.history.save()  # After the store's last write, so the snapshot carries its final fingerprint
+        self.retrain_worker.wait_idle()
+        self.retrain_worker.stop()
+        self.classifier.save_model()
+        self.classifier.store.close()
+
+    def load_classified_data(self):
+        """Classified history as a DataFrame, kept current in memory by the repository."""
+        return self.repository.history_frame()
+
+    def query_classified(self, category=None, source=None, start_date=None, end_date=None):
+        return self.repository.query(category=category, source=source, start_date=start_date, end_date=end_date)
+
+    def get_model_status(self):
+        """Return (active model version, whether a retrain is running or queued)."""
+        return self.classifier.model_version, self.retrain_worker.in_flight
+
+    def get_prediction_cache_stats(self):
+        return self.classifier.prediction_cache_stats()
+
+    def get_vendor_stats(self):
+        return self.classifier.vendor_index.stats()
+
+    def get_memory_report(self):
+        """Memory of the classification map and frames, compact vs plain representation."""
+        return format_memory_report(memory_report(
+            self.classifier.classifications, self.repository.history_frame(), self.df
+        ))
 
     # Function to show the most common tokens in the transaction descriptions
     # Development only. Comment self.controller.show_common_tokens() in load_file() for production
@@ -47,15 +247,8 @@ class AppController:
             print("No data loaded.")
             return
 
-        all_tokens = []
-
-        for desc in self.df["Details"].astype(str):
-            # Lowercase and remove special characters
-            desc = desc.lower()
-            tokens = re.findall(r"\b\w+\b", desc)
-            all_tokens.extend(tokens)
-
-        token_counts = Counter(all_tokens)
+        # Normalized descriptions are already lowercase and punctuation-free
+        token_counts = add_normalized_columns(self.df)[NORMALIZED_COLUMN].str.split().explode().value_counts()
         print(f"\nTop {top_n} most common tokens:\n")
-        for token, count in token_counts.most_common(top_n):
+        for token, count in token_counts.head(top_n).items():
             print(f"{token:<15} {count}")   
\ No newline at end of file
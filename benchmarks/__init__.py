@@ -0,0 +1,2 @@
+# Benchmarks for the expense classifier hot paths.
+# Run with: python -m benchmarks.run_benchmarks --sizes 1000 10000 --output bench.json
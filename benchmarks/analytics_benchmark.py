@@ -0,0 +1,163 @@
+# benchmarks/analytics_benchmark.py
+#
+# Times the data preparation behind the four analytics charts (no drawing) on a large synthetic
+# classified history, three ways: the original row-wise implementation (apply/lambda per row,
+# kept here as the reference), the vectorized functions from a frame (aggregating the spending
+# cube first), and from an already built cube as the GUI does. Results are checked against the
+# reference:
+#
+#   python -m benchmarks.analytics_benchmark --rows 1000000 --output analytics.json
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import (  # noqa: E402
+    CREDIT_CATEGORIES, spending_vs_transfer_data, spending_category_data, rolling_total_data, rolling_category_data
+)
+from benchmarks.synthetic import generate_transactions  # noqa: E402
+from compact import compact_frame  # noqa: E402
+from spending_cube import SpendingCube  # noqa: E402
+
+FREQ = 7
+WINDOW = 7
+TOP_N = 5
+HISTORY_DAYS = 3650  # Ten years of history, however many rows (the generator's span grows with rows)
+
+
+# --- Reference: the row-wise implementation the vectorized code replaces ---
+
+def _legacy_period(df, freq, start_date=None):
+    start_date = pd.to_datetime(start_date if start_date is not None else df["Date"].min())
+    df["Period"] = (((df["Date"] - start_date).dt.days // freq) * freq).apply(lambda x: start_date + pd.Timedelta(days=x))
+    return df
+
+
+def _legacy_spending(df):
+    df = df.copy()
+    df["Type"] = df["Category"].apply(lambda x: "Credit" if x in CREDIT_CATEGORIES else "Spending")
+    spending = df[df["Type"] == "Spending"].copy()
+    spending["Amount"] = -spending["Amount"]
+    return df, spending
+
+
+def legacy_spending_vs_transfer(df, freq):
+    df = _legacy_period(df.copy(), freq)
+    df["Type"] = df["Category"].apply(lambda x: "Credit" if x in CREDIT_CATEGORIES else "Spending")
+    df["SignedAmount"] = df.apply(lambda row: row["Amount"] if row["Type"] == "Credit" else -row["Amount"], axis=1)
+    return df.groupby(["Period", "Type"], observed=True)["SignedAmount"].sum().unstack(fill_value=0)
+
+
+def legacy_spending_category(df, freq, top_n):
+    spending = _legacy_period(_legacy_spending(df)[1], freq)
+    pivot = spending.pivot_table(index="Period", columns="Category", values="Amount", aggfunc="sum", observed=True).fillna(0)
+    return pivot[pivot.sum().sort_values(ascending=False).head(top_n).index]
+
+
+def legacy_rolling_total(df, window):
+    daily = _legacy_spending(df)[1].groupby("Date")["Amount"].sum().reset_index()
+    daily["Rolling"] = daily["Amount"].rolling(window=window).mean()
+    return daily
+
+
+def legacy_rolling_category(df, window, top_n):
+    spending = _legacy_spending(df)[1]
+    pivot = spending.pivot_table(index="Date", columns="Category", values="Amount", aggfunc="sum", observed=True).fillna(0)
+    return pivot[pivot.sum().sort_values(ascending=False).head(top_n).index].rolling(window=window).mean()
+
+
+def legacy_all(df):
+    return (
+        legacy_spending_vs_transfer(df, FREQ),
+        legacy_spending_category(df, FREQ, TOP_N),
+        legacy_rolling_total(df, WINDOW),
+        legacy_rolling_category(df, WINDOW, TOP_N),
+    )
+
+
+def vectorized_all(data):
+    return (
+        spending_vs_transfer_data(data, FREQ)[0],
+        spending_category_data(data, FREQ, top_n=TOP_N),
+        rolling_total_data(data, WINDOW),
+        rolling_category_data(data, WINDOW, TOP_N),
+    )
+
+
+def max_difference(reference, result):
+    """Largest absolute difference over the reference's labels (inf if the labels differ)."""
+    reference, result = pd.DataFrame(reference), pd.DataFrame(result)
+    if "Date" in reference.columns:
+        reference, result = reference.set_index("Date"), result.set_index("Date")
+    if set(reference.columns) != set(result.columns) or not reference.index.equals(result.index):
+        return float("inf")
+    diff = (reference - result[reference.columns]).abs().to_numpy(dtype=float)
+    return float(np.nanmax(diff)) if diff.size else 0.0
+
+
+def history_frame(rows, seed=0):
+    """Classified history as the app holds it: parsed dates and dictionary-encoded categories."""
+    df = generate_transactions(rows, n_merchants=max(22, rows // 200), seed=seed, include_category=True)
+    days = np.sort(np.random.default_rng(seed).integers(0, min(HISTORY_DAYS, max(rows // 8, 30)), rows))
+    df["Date"] = pd.Timestamp("2020-01-01") + pd.to_timedelta(days, unit="D")
+    return compact_frame(df.drop(columns="Balance"))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(rows, skip_legacy=False):
+    df = history_frame(rows)
+    cube, build_s = timed(SpendingCube.from_frame, df)
+    from_frame, from_frame_s = timed(vectorized_all, df)
+    from_cube, from_cube_s = timed(vectorized_all, cube)
+
+    report = {
+        "rows": rows,
+        "cube_cells": len(cube),
+        "cube_build_s": build_s,
+        "vectorized_from_frame_s": from_frame_s,
+        "vectorized_from_cube_s": from_cube_s,
+    }
+    if not skip_legacy:
+        reference, legacy_s = timed(legacy_all, df)
+        report["legacy_s"] = legacy_s
+        # Sums of integer cents versus row-wise float sums: equal up to float rounding
+        report["max_difference"] = max(
+            max(max_difference(ref, a), max_difference(ref, b)) for ref, a, b in zip(reference, from_frame, from_cube)
+        )
+
+    for key, value in report.items():
+        print(f"{key:<26} {value}", file=sys.stderr)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark analytics chart data preparation.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Do not time the (slow) row-wise reference")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, args.skip_legacy)
+    report["pandas"] = pd.__version__
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/blocking_benchmark.py
+#
+# Compares fuzzy matching against a large description history with an exhaustive scan
+# (process.extract over every string) and with the n-gram blocking index at several
+# recall/speed settings. The index is kept here, with the benchmark; the app clusters a
+# loaded file with cdist instead (fuzzy_utils.cluster_transactions):
+#
+#   python -m benchmarks.blocking_benchmark --history 200000 --queries 500 --output blocking.json
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from rapidfuzz import process, fuzz
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_transactions  # noqa: E402
+from config import FUZZY_MATCH_THRESHOLD  # noqa: E402
+from text_normalization import normalize_series  # noqa: E402
+
+LIMIT = 5
+NGRAM = 3
+BLOCKING_FEATURES = 2 ** 20
+# (min_overlap, max_candidates) pairs, fastest first
+SETTINGS = [(0.5, 50), (0.3, 200), (0.2, 1000)]
+
+
+class NgramBlockingIndex:
+    """
+    Character n-gram inverted index over normalized descriptions, used to pick a small candidate
+    set before fuzzy scoring. A query's candidates are the indexed strings sharing at least
+    `min_overlap` of its n-grams, best `max_candidates` first. Lower min_overlap / higher
+    max_candidates trade speed for recall. Grams are hashed, so adding strings never re-indexes
+    the existing ones.
+    """
+
+    def __init__(self, ngram=NGRAM, min_overlap=0.2, max_candidates=1000):
+        self.ngram = ngram
+        self.min_overlap = min_overlap
+        self.max_candidates = max_candidates
+        self.texts = []
+        self._positions = {}  # text -> id
+        self._blocks = []  # (strings x grams) matrices not yet merged into the postings
+        self._postings = sparse.csr_matrix((BLOCKING_FEATURES, 0), dtype=np.int32)  # grams x strings
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, text):
+        return text in self._positions
+
+    def _vectorizer(self):
+        return HashingVectorizer(
+            analyzer="char_wb", ngram_range=(self.ngram, self.ngram), n_features=BLOCKING_FEATURES,
+            alternate_sign=False, binary=True, norm=None, lowercase=False, dtype=np.int32
+        )
+
+    def add(self, texts):
+        """Index strings not seen before. Returns how many were added."""
+        new = []
+        for text in texts:
+            if text not in self._positions:
+                self._positions[text] = len(self.texts)
+                self.texts.append(text)
+                new.append(text)
+        if new:
+            self._blocks.append(self._vectorizer().transform(new))
+        return len(new)
+
+    def candidates(self, text):
+        """Ids of indexed strings likely to match `text`, most shared n-grams first."""
+        return self.candidates_batch([text])[0]
+
+    def candidates_batch(self, texts):
+        """candidates() for many queries with one sparse product."""
+        postings = self._merged_postings()
+        queries = self._vectorizer().transform(texts)
+        shared = (queries @ postings).tocsr()  # queries x strings: n-grams in common
+        gram_counts = np.diff(queries.indptr)
+
+        results = []
+        for i in range(len(texts)):
+            start, end = shared.indptr[i], shared.indptr[i + 1]
+            ids, counts = shared.indices[start:end], shared.data[start:end]
+            keep = counts >= max(1, self.min_overlap * gram_counts[i])
+            ids, counts = ids[keep], counts[keep]
+            if len(ids) > self.max_candidates:
+                top = np.argpartition(-counts, self.max_candidates - 1)[:self.max_candidates]
+                ids, counts = ids[top], counts[top]
+            results.append(ids[np.argsort(-counts, kind="stable")])
+        return results
+
+    def _merged_postings(self):
+        if self._blocks:
+            rows = sparse.vstack(self._blocks).T.tocsr()
+            self._postings = sparse.hstack([self._postings, rows]).tocsr()
+            self._blocks = []
+        return self._postings
+
+
+def find_similar(target, index, threshold=FUZZY_MATCH_THRESHOLD, limit=5):
+    """
+    Fuzzy matches of a normalized description among the strings of an NgramBlockingIndex.
+    Only the index's candidates are scored, instead of every indexed string. Returns (text, score) pairs.
+    """
+    choices = [index.texts[i] for i in index.candidates(target)]
+    matches = process.extract(target, choices, scorer=fuzz.token_sort_ratio, limit=limit, score_cutoff=threshold)
+    return [(text, score) for text, score, _ in matches]
+
+
+def unique_descriptions(n, seed):
+    """At least n distinct normalized descriptions from the synthetic generator."""
+    df = generate_transactions(n * 2, n_merchants=max(22, n // 20), seed=seed)
+    texts = normalize_series(df["Details"]).drop_duplicates()
+    return texts.head(n).tolist()
+
+
+def run(history_size, n_queries, threshold, seed=0):
+    history = unique_descriptions(history_size, seed)
+    queries = unique_descriptions(n_queries * 4, seed + 1)[:n_queries]
+
+    start = time.perf_counter()
+    exhaustive = [
+        [score for _, score, _ in process.extract(q, history, scorer=fuzz.token_sort_ratio, limit=LIMIT, score_cutoff=threshold)]
+        for q in queries
+    ]
+    exhaustive_s = time.perf_counter() - start
+    results = [{"method": "exhaustive", "query_ms": 1000 * exhaustive_s / n_queries, "recall": 1.0}]
+
+    for min_overlap, max_candidates in SETTINGS:
+        index = NgramBlockingIndex(min_overlap=min_overlap, max_candidates=max_candidates)
+        start = time.perf_counter()
+        index.add(history)
+        index.candidates("warm up")  # Merge postings outside the timed queries
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        blocked = [[score for _, score in find_similar(q, index, threshold, LIMIT)] for q in queries]
+        blocked_s = time.perf_counter() - start
+
+        # Share of the exhaustive top-k matched: the blocked k-th best score is at least as good.
+        # Compared by score because many history strings tie and either tied string is a correct match.
+        found = sum(sum(b_k >= e_k for e_k, b_k in zip(e, b)) for e, b in zip(exhaustive, blocked))
+        expected = sum(len(e) for e in exhaustive)
+        results.append({
+            "method": f"blocked(min_overlap={min_overlap}, max_candidates={max_candidates})",
+            "build_s": build_s,
+            "query_ms": 1000 * blocked_s / n_queries,
+            "recall": found / expected if expected else 1.0,
+        })
+
+    for r in results:
+        print(f"{r['method']:<50} {r['query_ms']:>9.2f} ms/query  recall={r['recall']:.3f}", file=sys.stderr)
+    return {"history": len(history), "queries": n_queries, "threshold": threshold, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fuzzy-matching blocking index against an exhaustive scan.")
+    parser.add_argument("--history", type=int, default=100000, help="Unique descriptions in the history")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=FUZZY_MATCH_THRESHOLD)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args.history, args.queries, args.threshold)
+    report["numpy"] = np.__version__
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
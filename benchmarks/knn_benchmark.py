@@ -0,0 +1,100 @@
+# benchmarks/knn_benchmark.py
+#
+# Compares the classifier engines (Naive Bayes and kNN) on a synthetic manual-classification
+# history: training time, batch prediction time and accuracy against the true merchant category.
+# For the kNN engine it also reports neighbour recall against an exhaustive similarity search:
+#
+#   python -m benchmarks.knn_benchmark --history 200000 --queries 10000 --output knn.json
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_transactions, generate_classifications  # noqa: E402
+from expense_classifier import ExpenseClassifier  # noqa: E402
+from text_normalization import clean_series  # noqa: E402
+from vendor_index import VendorIndex  # noqa: E402
+
+ENGINES = ["nb", "knn"]
+RECALL_SAMPLE = 500  # Queries checked against the exhaustive neighbour search
+
+
+def neighbour_recall(classifier, texts):
+    """Share of the exact top-k neighbours (by similarity score) found by the shortlisted search."""
+    knn = classifier.classifier
+    queries = classifier.vectorizer.transform(texts)
+    found, _ = knn._neighbours(queries)
+    exact = knn._top_per_row(queries @ knn._rows.T, knn.n_neighbors)
+
+    hits = expected = 0
+    for i in range(queries.shape[0]):
+        e = np.sort(exact.data[exact.indptr[i]:exact.indptr[i + 1]])[::-1]
+        f = np.sort(found.data[found.indptr[i]:found.indptr[i + 1]])[::-1]
+        # Compared by score: tied neighbours are equally correct
+        hits += sum(f_k >= e_k - 1e-6 for e_k, f_k in zip(e, f))
+        expected += len(e)
+    return hits / expected if expected else 1.0
+
+
+def run(history_size, n_queries, workdir, seed=0):
+    history = generate_transactions(history_size, n_merchants=max(22, history_size // 200), seed=seed, include_category=True)
+    queries = generate_transactions(n_queries, n_merchants=max(22, history_size // 200), seed=seed + 1, include_category=True)
+    path = os.path.join(workdir, "classifications.json")
+    with open(path, "w") as f:
+        json.dump(generate_classifications(history, manual_fraction=1.0, seed=seed), f)
+
+    results = []
+    for engine in ENGINES:
+        start = time.perf_counter()
+        classifier = ExpenseClassifier(classification_file=path, model_cache_file=None, engine=engine)
+        train_s = time.perf_counter() - start
+        classifier.vendor_index = VendorIndex()  # Score every query with the model, not the exact-match memory
+
+        start = time.perf_counter()
+        predictions = classifier.predict_batch(queries["Details"], top_n=3)
+        predict_s = time.perf_counter() - start
+
+        result = {
+            "engine": engine,
+            "train_s": train_s,
+            "predict_s": predict_s,
+            "accuracy": float((predictions["Category_1"] == queries["Category"]).mean()),
+            "mean_confidence": float(predictions["Confidence_1"].mean()),
+        }
+        if engine == "knn":
+            result["stored_rows"] = classifier.classifier.n_rows
+            sample = clean_series(queries["Details"].head(RECALL_SAMPLE)).tolist()
+            result["neighbour_recall"] = neighbour_recall(classifier, sample)
+        results.append(result)
+        print(f"{engine:<4} train={train_s:7.2f}s predict={predict_s:7.2f}s accuracy={result['accuracy']:.4f}", file=sys.stderr)
+
+    return {"history": history_size, "queries": n_queries, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the kNN classifier engine against Naive Bayes.")
+    parser.add_argument("--history", type=int, default=200000, help="Manual classifications to train on")
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = run(args.history, args.queries, workdir)
+    report["numpy"] = np.__version__
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
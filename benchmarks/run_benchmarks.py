@@ -0,0 +1,270 @@
+# benchmarks/run_benchmarks.py
+#
+# Times the application's hot paths on synthetic bank exports and writes JSON results
+# so runs can be compared for regressions:
+#
+#   python -m benchmarks.run_benchmarks --sizes 1000 10000 100000 --output bench.json
+#   python -m benchmarks.run_benchmarks --sizes 10000 --scenarios train_model predict_batch
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Run from the repository root so the application modules are importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import (  # noqa: E402
+    create_spending_vs_transfer_plot, create_spending_category_bar_plot,
+    create_rolling_total_plot, create_rolling_category_plot
+)
+from benchmarks.synthetic import generate_transactions, generate_classifications  # noqa: E402
+from expense_classifier import ExpenseClassifier  # noqa: E402
+from classification_store import JsonClassificationStore  # noqa: E402
+from fuzzy_utils import group_similar_transactions, cluster_transactions  # noqa: E402
+from history_snapshot import HistorySnapshot  # noqa: E402
+from spending_cube import SpendingCube  # noqa: E402
+from text_normalization import add_normalized_columns  # noqa: E402
+from utils import generate_transaction_id, generate_transaction_ids, load_classified_data  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000]
+PREDICTION_SAMPLE = 1000  # Single predictions timed per run (they are per-call, not per-frame)
+GROUPING_TARGETS = 20  # group_similar_transactions calls per run
+
+
+class BenchmarkContext:
+    """Synthetic data and fixtures for one benchmark size, built lazily and shared by scenarios."""
+
+    def __init__(self, rows, workdir, seed=0):
+        self.rows = rows
+        self.workdir = workdir
+        self.seed = seed
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def labelled_df(self):
+        return self._get("labelled_df", lambda: generate_transactions(
+            self.rows, n_merchants=max(22, self.rows // 200), seed=self.seed, include_category=True
+        ))
+
+    @property
+    def df(self):
+        return self._get("df", lambda: self.labelled_df.drop(columns="Category"))
+
+    @property
+    def csv_path(self):
+        def build():
+            path = os.path.join(self.workdir, f"transactions_{self.rows}.csv")
+            self.df.to_csv(path, index=False)
+            return path
+        return self._get("csv_path", build)
+
+    @property
+    def classification_path(self):
+        def build():
+            path = os.path.join(self.workdir, f"classifications_{self.rows}.json")
+            with open(path, "w") as f:
+                json.dump(generate_classifications(self.labelled_df, seed=self.seed), f)
+            return path
+        return self._get("classification_path", build)
+
+    @property
+    def classifier(self):
+        return self._get("classifier", lambda: ExpenseClassifier(
+            classification_file=self.classification_path, model_cache_file=None
+        ))
+
+    @property
+    def classified_df(self):
+        return self._get("classified_df", lambda: load_classified_data(self.classification_path))
+
+
+# --- Scenarios: each takes a context and returns a zero-argument callable to time ---
+
+def scenario_load_csv(ctx):
+    path = ctx.csv_path
+    return lambda: pd.read_csv(path)
+
+
+def scenario_generate_transaction_id(ctx):
+    df = ctx.df
+    return lambda: df.apply(generate_transaction_id, axis=1)
+
+
+def scenario_generate_transaction_ids(ctx):
+    df = ctx.df
+    return lambda: generate_transaction_ids(df)
+
+
+def scenario_train_model(ctx):
+    classifier = ctx.classifier
+    return lambda: classifier._train_model()
+
+
+def scenario_predict_single(ctx):
+    classifier = ctx.classifier
+    details = ctx.df["Details"].head(PREDICTION_SAMPLE).tolist()
+
+    def run():
+        classifier.prediction_cache.clear()
+        for text in details:
+            classifier.predict_category(text, top_n=2)
+    return run
+
+
+def scenario_predict_batch(ctx):
+    classifier = ctx.classifier
+    details = ctx.df["Details"]
+    return lambda: classifier.predict_batch(details, top_n=2)
+
+
+def scenario_group_similar_transactions(ctx):
+    df = ctx.df
+    targets = [df.iloc[i] for i in np.linspace(0, len(df) - 1, GROUPING_TARGETS).astype(int)]
+
+    def run():
+        for row in targets:
+            group_similar_transactions(df, row)
+    return run
+
+
+def scenario_cluster_transactions(ctx):
+    df = add_normalized_columns(ctx.df.copy())
+    return lambda: cluster_transactions(df)
+
+
+def scenario_load_classified_data(ctx):
+    path = ctx.classification_path
+    return lambda: load_classified_data(path)
+
+
+def scenario_load_history_snapshot(ctx):
+    store = JsonClassificationStore(ctx.classification_path)
+    path = os.path.join(ctx.workdir, f"history_{ctx.rows}.feather")
+    HistorySnapshot(store, path).load()  # Build the file once; each timed call is a cold read
+    return lambda: HistorySnapshot(store, path).load()
+
+
+def scenario_build_spending_cube(ctx):
+    classified = ctx.classified_df
+    return lambda: SpendingCube.from_frame(classified)
+
+
+def _plot_scenario(plot, from_cube=False, **kwargs):
+    def scenario(ctx):
+        if from_cube:
+            # As the GUI does: the cube is maintained incrementally, so only the chart derivation is timed
+            cube = SpendingCube.from_frame(ctx.classified_df)
+            return lambda: plot(cube, **kwargs)
+        classified = ctx.classified_df
+        return lambda: plot(classified.copy(), **kwargs)
+    return scenario
+
+
+SCENARIOS = {
+    "load_csv": scenario_load_csv,
+    "generate_transaction_id": scenario_generate_transaction_id,
+    "generate_transaction_ids": scenario_generate_transaction_ids,
+    "train_model": scenario_train_model,
+    "predict_single": scenario_predict_single,
+    "predict_batch": scenario_predict_batch,
+    "group_similar_transactions": scenario_group_similar_transactions,
+    "cluster_transactions": scenario_cluster_transactions,
+    "load_classified_data": scenario_load_classified_data,
+    "load_history_snapshot": scenario_load_history_snapshot,
+    "plot_spending_vs_transfer": _plot_scenario(create_spending_vs_transfer_plot, freq=7),
+    "plot_spending_category_bar": _plot_scenario(create_spending_category_bar_plot, freq=7),
+    "plot_rolling_total": _plot_scenario(create_rolling_total_plot, window=7),
+    "plot_rolling_category": _plot_scenario(create_rolling_category_plot, window=7),
+    "build_spending_cube": scenario_build_spending_cube,
+    "plot_spending_category_bar_cube": _plot_scenario(create_spending_category_bar_plot, from_cube=True, freq=7),
+    "plot_rolling_category_cube": _plot_scenario(create_rolling_category_plot, from_cube=True, window=7),
+}
+
+# Work units per call, for throughput reporting (defaults to the frame size)
+UNITS = {
+    "predict_single": lambda ctx: min(PREDICTION_SAMPLE, ctx.rows),
+    "group_similar_transactions": lambda ctx: GROUPING_TARGETS,
+}
+
+
+def time_callable(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_benchmarks(sizes, scenarios, repeat, workdir):
+    results = []
+    for rows in sizes:
+        ctx = BenchmarkContext(rows, workdir)
+        for name in scenarios:
+            fn = SCENARIOS[name](ctx)
+            timings = time_callable(fn, repeat)
+            units = UNITS.get(name, lambda c: c.rows)(ctx)
+            best = min(timings)
+            result = {
+                "scenario": name,
+                "rows": rows,
+                "repeat": repeat,
+                "best_s": best,
+                "median_s": statistics.median(timings),
+                "units": units,
+                "units_per_s": units / best if best > 0 else None,
+            }
+            results.append(result)
+            print(f"{name:<32} rows={rows:<9} best={best:.4f}s median={result['median_s']:.4f}s", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the expense classifier hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Rows per synthetic export")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario (best and median reported)")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmarks(args.sizes, args.scenarios, args.repeat, workdir)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/synthetic.py
+
+import numpy as np
+import pandas as pd
+from utils import generate_transaction_ids
+
+# (merchant stem, category, typical amount) - spending amounts are negative like a bank export
+MERCHANTS = [
+    ("COUNTDOWN", "Groceries", -85.0),
+    ("NEW WORLD", "Groceries", -62.0),
+    ("PAK N SAVE", "Groceries", -120.0),
+    ("Z ENERGY", "Fuel", -70.0),
+    ("BP CONNECT", "Fuel", -65.0),
+    ("UBER TRIP", "Taxi/Rideshare (Uber, Lyft)", -18.0),
+    ("AT HOP TOP UP", "Public Transport", -20.0),
+    ("STARBUCKS", "Coffee/Tea", -6.5),
+    ("CAFE LOCALE", "Cafe/Lunch", -17.0),
+    ("MCDONALDS", "Fast food", -14.0),
+    ("SUSHI TRAIN", "Dining Out", -38.0),
+    ("SPARK NZ", "Phone", -55.0),
+    ("MERCURY ENERGY", "Power/Electricity", -140.0),
+    ("WASTE MANAGEMENT", "Waste Disposal", -30.0),
+    ("UNICHEM PHARMACY", "Prescription Medications", -12.0),
+    ("SMILE DENTAL", "Dental", -180.0),
+    ("KMART", "Household durables", -45.0),
+    ("WAREHOUSE STATIONERY", "Books", -25.0),
+    ("NETFLIX.COM", "Subscriptions", -18.5),
+    ("TF JOINT SAVING", "TF Joint saving", 500.0),
+    ("TF BILLS", "TF Bills", 300.0),
+    ("SALARY ACME LTD", "Income", 2500.0),
+]
+
+NOISE_PREFIXES = ["POS", "EFTPOS", "DEBIT", "VISA"]
+LOCATIONS = ["AUCKLAND", "WELLINGTON", "DUNEDIN", "CHCH", "HAMILTON", "NELSON"]
+
+
+def generate_transactions(n_rows, n_merchants=None, start_date="2020-01-01", seed=0, include_category=False):
+    """
+    Produce a synthetic bank export with Date/Details/Amount/Balance columns.
+    Merchants repeat with a long-tailed frequency and carry noise tokens (POS, store numbers,
+    locations) like real statements. Dates are dd/mm/YYYY strings as exported.
+    With include_category the true merchant category is added as a Category column.
+    """
+    rng = np.random.default_rng(seed)
+    merchants = MERCHANTS if n_merchants is None else _expand_merchants(n_merchants, rng)
+
+    # Zipf-like popularity so a handful of merchants dominate
+    weights = 1.0 / np.arange(1, len(merchants) + 1)
+    weights /= weights.sum()
+    picks = rng.choice(len(merchants), size=n_rows, p=weights)
+
+    stems = np.array([m[0] for m in merchants], dtype=object)[picks]
+    base_amounts = np.array([m[2] for m in merchants])[picks]
+
+    prefixes = np.array(NOISE_PREFIXES, dtype=object)[rng.integers(0, len(NOISE_PREFIXES), n_rows)]
+    has_prefix = rng.random(n_rows) < 0.6
+    store_numbers = rng.integers(1, 400, n_rows).astype(str)
+    has_store = rng.random(n_rows) < 0.5
+    locations = np.array(LOCATIONS, dtype=object)[rng.integers(0, len(LOCATIONS), n_rows)]
+
+    details = pd.Series(stems)
+    details = pd.Series(np.where(has_prefix, prefixes + " ", "")) + details
+    details = details + pd.Series(np.where(has_store, " " + store_numbers, ""))
+    details = details + " " + pd.Series(locations)
+
+    amounts = np.round(base_amounts * rng.lognormal(0.0, 0.35, n_rows), 2)
+    days = np.sort(rng.integers(0, max(n_rows // 8, 30), n_rows))
+    dates = pd.to_datetime(start_date) + pd.to_timedelta(days, unit="D")
+    balance = np.round(5000 + np.cumsum(amounts), 2)
+
+    df = pd.DataFrame({
+        "Date": dates.strftime("%d/%m/%Y"),
+        "Details": details.to_numpy(),
+        "Amount": amounts,
+        "Balance": balance,
+    })
+    if include_category:
+        df["Category"] = np.array([m[1] for m in merchants], dtype=object)[picks]
+    return df
+
+
+def generate_classifications(df, manual_fraction=0.8, seed=0):
+    """
+    Build a classification mapping (UID -> entry) from a frame generated with include_category=True.
+    A fraction of rows is marked manual, the rest auto.
+    """
+    rng = np.random.default_rng(seed)
+    manual = rng.random(len(df)) < manual_fraction
+    uids = generate_transaction_ids(df)
+
+    return {
+        uid: {
+            "Description": details,
+            "Category": category,
+            "Source": "manual" if is_manual else "auto",
+            "Date": date,
+            "Amount": float(amount),
+        }
+        for uid, details, category, is_manual, date, amount in zip(
+            uids, df["Details"], df["Category"], manual, df["Date"], df["Amount"]
+        )
+    }
+
+
+def _expand_merchants(n_merchants, rng):
+    """Derive extra merchant stems so vocabulary size scales with the benchmark."""
+    merchants = list(MERCHANTS)
+    i = 0
+    while len(merchants) < n_merchants:
+        stem, category, amount = MERCHANTS[i % len(MERCHANTS)]
+        merchants.append((f"{stem} BRANCH{i}", category, amount * float(rng.uniform(0.5, 1.5))))
+        i += 1
+    return merchants[:n_merchants]
@@ -0,0 +1,110 @@
+# classification_repository.py
+
+import logging
+from collections import Counter, namedtuple
+import pandas as pd
+from spending_cube import SpendingCube
+
+# kind is "added" or "updated"; old is None for additions
+ClassificationChange = namedtuple("ClassificationChange", ["kind", "uid", "old", "new"])
+
+
+class ClassificationRepository:
+    """
+    Single in-memory owner of classification state shared by the controller and every GUI tab.
+    Writes go through set()/set_many(), which update the classifier (model, vendor memory, dirty
+    rows for the store) and the classified-history frame, then notify subscribers with the list of
+    changes so views can patch themselves instead of reloading from disk.
+    """
+
+    def __init__(self, classifier, history):
+        self.classifier = classifier
+        self.history = history
+        self._subscribers = []
+        self._category_counts = None  # Category -> number of classifications, built on first use
+        self._spending_cube = None  # Day x category totals of the history, built on first use
+
+    @property
+    def classifications(self):
+        return self.classifier.classifications
+
+    def __contains__(self, uid):
+        return uid in self.classifier.classifications
+
+    def __len__(self):
+        return len(self.classifier.classifications)
+
+    def get(self, uid, default=None):
+        return self.classifier.classifications.get(uid, default)
+
+    def categories(self):
+        """Sorted categories currently in use."""
+        if self._category_counts is None:
+            self._category_counts = Counter(
+                entry.get("Category") for entry in self.classifier.classifications.values()
+            )
+        return sorted(category for category, count in self._category_counts.items() if count > 0 and category)
+
+    def history_frame(self):
+        """Classified history (UID/Date/Details/Amount/Category/Source) including unsaved changes."""
+        return self.history.load()
+
+    def query(self, category=None, source=None, start_date=None, end_date=None):
+        """History filtered by category, source and an inclusive date range (answered from memory)."""
+        df = self.history_frame()
+        if df.empty:
+            return df
+        mask = pd.Series(True, index=df.index)
+        if category is not None:
+            mask &= df["Category"] == category
+        if source is not None:
+            mask &= df["Source"] == source
+        if start_date is not None:
+            mask &= df["Date"] >= pd.to_datetime(start_date)
+        if end_date is not None:
+            mask &= df["Date"] <= pd.to_datetime(end_date)
+        return df[mask]
+
+    def spending_cube(self):
+        """Daily totals per category of the classified history, kept current by set()/set_many()."""
+        if self._spending_cube is None:
+            self._spending_cube = SpendingCube.from_frame(self.history_frame())
+        return self._spending_cube
+
+    def subscribe(self, callback):
+        """Call `callback(changes)` with a list of ClassificationChange after every batch of writes."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def set(self, uid, entry):
+        return self.set_many({uid: entry})
+
+    def set_many(self, entries):
+        """Store several classifications and publish them as one batch. Returns the changes."""
+        changes = []
+        for uid, entry in entries.items():
+            old = self.classifier.classifications.get(uid)
+            self.classifier.set_classification(uid, entry)
+            changes.append(ClassificationChange("added" if old is None else "updated", uid, old, entry))
+            if self._category_counts is not None:
+                if old is not None:
+                    self._category_counts[old.get("Category")] -= 1
+                self._category_counts[entry.get("Category")] += 1
+
+        if changes:
+            self.history.apply_changes(self.classifier.classifications, [c.uid for c in changes])
+            if self._spending_cube is not None:
+                self._spending_cube.apply_changes(changes)
+            self._publish(changes)
+        return changes
+
+    def _publish(self, changes):
+        for callback in list(self._subscribers):
+            try:
+                callback(changes)
+            except Exception:
+                # A broken view must not stop the change from reaching the others
+                logging.exception("Classification change subscriber failed.")
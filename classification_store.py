@@ -0,0 +1,227 @@
+# classification_store.py
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+import pandas as pd
+from config import CLASSIFICATION_FILE, SQLITE_FILE, STORAGE_BACKEND
+from utils import load_classified_data, atomic_write
+from compact import json_default
+
+
+class ClassificationStore(ABC):
+    """
+    Storage backend for classifications (UID -> entry dict).
+    Backends persist either the full mapping or just the UIDs that changed.
+    """
+
+    @abstractmethod
+    def load_all(self):
+        """Return every stored classification as {uid: entry}."""
+
+    @abstractmethod
+    def write(self, classifications, uids=None):
+        """Persist classifications. `uids` limits the write to changed rows where the backend supports it."""
+
+    @abstractmethod
+    def to_dataframe(self):
+        """Classified history as a DataFrame (UID/Date/Details/Amount/Category/Source) with parsed dates."""
+
+    @abstractmethod
+    def fingerprint(self):
+        """Cheap token that changes whenever the stored data does (used to validate derived snapshots)."""
+
+    def changed_elsewhere(self):
+        """True once another process has written to the store, so the in-memory state is incomplete."""
+        return False
+
+    def close(self):
+        pass
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class JsonClassificationStore(ClassificationStore):
+    """The original single-file JSON format; every write rewrites the whole file."""
+
+    def __init__(self, filepath=CLASSIFICATION_FILE):
+        self.filepath = filepath
+
+    def load_all(self):
+        if not os.path.exists(self.filepath):
+            logging.warning(f"Classification file {self.filepath} not found. Starting empty.")
+            return {}
+        with open(self.filepath, "r") as f:
+            return json.load(f)
+
+    def write(self, classifications, uids=None):
+        # Crash-safe: written to a temp file next to the target, then renamed over it
+        with atomic_write(self.filepath) as f:
+            json.dump(classifications, f, indent=4, default=json_default)
+
+    def to_dataframe(self):
+        return load_classified_data(self.filepath)
+
+    def fingerprint(self):
+        return _file_stamp(self.filepath)
+
+
+class SqliteClassificationStore(ClassificationStore):
+    """SQLite backend with single-row upserts keyed by UID (filtering is done on the in-memory history)."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS classifications (
+            uid TEXT PRIMARY KEY,
+            description TEXT,
+            category TEXT,
+            source TEXT,
+            date TEXT,      -- as exported (dd/mm/YYYY)
+            date_iso TEXT,  -- YYYY-MM-DD, parsed without a format guess on load
+            amount REAL
+        );
+        -- Category/date/source indexes of the former store-side queries: only slowed down upserts
+        DROP INDEX IF EXISTS idx_classifications_category;
+        DROP INDEX IF EXISTS idx_classifications_date;
+        DROP INDEX IF EXISTS idx_classifications_source;
+    """
+
+    def __init__(self, filepath=SQLITE_FILE):
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filepath, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._revision = self._read_revision()  # Last revision this connection has seen or written
+        self._changed_elsewhere = False
+
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT uid, description, category, source, date, amount FROM classifications"
+            ).fetchall()
+        return {
+            uid: {"Description": description, "Category": category, "Source": source, "Date": date, "Amount": amount}
+            for uid, description, category, source, date, amount in rows
+        }
+
+    def write(self, classifications, uids=None):
+        if uids is None:
+            uids = classifications.keys()
+
+        upserts = []
+        deletes = []
+        for uid in uids:
+            entry = classifications.get(uid)
+            if entry is None:
+                deletes.append((uid,))
+            else:
+                upserts.append(self._to_row(uid, entry))
+
+        with self._lock, self._conn:  # One transaction per batch
+            if upserts:
+                self._conn.executemany(
+                    """
+                    INSERT INTO classifications (uid, description, category, source, date, date_iso, amount)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(uid) DO UPDATE SET
+                        description = excluded.description,
+                        category = excluded.category,
+                        source = excluded.source,
+                        date = excluded.date,
+                        date_iso = excluded.date_iso,
+                        amount = excluded.amount
+                    """,
+                    upserts
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM classifications WHERE uid = ?", deletes)
+            if upserts or deletes:
+                # Data revision for fingerprint(), committed atomically with the rows it describes
+                revision = self._read_revision()
+                if revision != self._revision:
+                    self._changed_elsewhere = True  # Another process (e.g. the inbox watcher) wrote since
+                self._conn.execute(f"PRAGMA user_version = {int(revision) + 1}")
+                self._revision = revision + 1
+
+    def to_dataframe(self):
+        sql = (
+            "SELECT uid AS UID, date_iso AS Date, description AS Details, amount AS Amount, "
+            "category AS Category, source AS Source FROM classifications"
+        )
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn)
+        if df.empty:
+            return pd.DataFrame()
+        df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d", errors="coerce")
+        return df.dropna(subset=["Date"])
+
+    def fingerprint(self):
+        # The revision bumped by every write; file stamps would change when close() checkpoints the WAL.
+        # The inode tells a recreated database (revisions counting from 0 again) from the old one.
+        with self._lock:
+            revision = self._read_revision()
+        return [revision, os.stat(self.filepath).st_ino]
+
+    def changed_elsewhere(self):
+        with self._lock:
+            return self._changed_elsewhere or self._read_revision() != self._revision
+
+    def _read_revision(self):
+        return self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_row(uid, entry):
+        date = entry.get("Date")
+        parsed = pd.to_datetime(date, format="%d/%m/%Y", errors="coerce") if date is not None else pd.NaT
+        amount = entry.get("Amount")
+        return (
+            uid,
+            entry.get("Description"),
+            entry.get("Category"),
+            entry.get("Source"),
+            None if date is None else str(date),
+            None if pd.isna(parsed) else parsed.strftime("%Y-%m-%d"),
+            None if amount is None else float(amount),
+        )
+
+
+def migrate_json_to_sqlite(json_path=CLASSIFICATION_FILE, sqlite_path=SQLITE_FILE):
+    """One-shot copy of an existing JSON classification file into the SQLite store."""
+    classifications = JsonClassificationStore(json_path).load_all()
+    store = SqliteClassificationStore(sqlite_path)
+    store.write(classifications)
+    logging.info(f"Migrated {len(classifications)} classifications from {json_path} to {sqlite_path}.")
+    return store
+
+
+def create_store(backend=STORAGE_BACKEND, classification_file=CLASSIFICATION_FILE, sqlite_file=SQLITE_FILE):
+    """Build the configured backend. A new SQLite store is seeded from the JSON file if one exists."""
+    if backend == "json":
+        return JsonClassificationStore(classification_file)
+    if backend == "sqlite":
+        if not os.path.exists(sqlite_file) and os.path.exists(classification_file):
+            return migrate_json_to_sqlite(classification_file, sqlite_file)
+        return SqliteClassificationStore(sqlite_file)
+    raise ValueError(f"Unknown storage backend: {backend!r} (expected 'json' or 'sqlite')")
+
+
+if __name__ == "__main__":
+    # python classification_store.py [json_path] [sqlite_path]
+    migrate_json_to_sqlite(*sys.argv[1:3]).close()
@@ -0,0 +1,84 @@
+# classify_cli.py
+#
+# Headless classification of bank exports too large for the GUI. Streams the input in chunks
+# so memory stays flat regardless of file size:
+#
+#   python classify_cli.py statements.csv -o classified.csv
+#   python classify_cli.py statements.csv -o classified.csv --chunksize 20000 --threshold 0.95
+
+import argparse
+import logging
+import sys
+import time
+import pandas as pd
+from config import AUTO_CLASSIFY_THRESHOLD, CLI_CHUNK_SIZE
+from expense_classifier import ExpenseClassifier
+from ingest import normalize_columns, amount_dtypes
+from utils import generate_transaction_ids
+
+OUTPUT_COLUMNS = ["UID", "Category", "Confidence", "Source"]
+
+
+def classify_chunk(classifier, chunk, threshold=AUTO_CLASSIFY_THRESHOLD):
+    """
+    Classify one chunk of an export. Returns UID/Category/Confidence/Source rows where Source is
+    the stored source for already-classified UIDs, 'vendor' or 'auto' for predictions meeting
+    the threshold, and 'review' (best guess kept) for the rest. Read chunks with
+    amount_dtypes() so their UIDs match a whole-file load.
+    """
+    chunk = normalize_columns(chunk)
+
+    uids = generate_transaction_ids(chunk)
+    out = pd.DataFrame({"UID": uids, "Category": None, "Confidence": float("nan"), "Source": None})
+
+    stored = uids.map(classifier.classifications)
+    known = stored.notna()
+    if known.any():
+        out.loc[known, "Category"] = stored[known].map(lambda entry: entry.get("Category"))
+        out.loc[known, "Confidence"] = 1.0
+        out.loc[known, "Source"] = stored[known].map(lambda entry: entry.get("Source"))
+
+    if not known.all():
+        predictions = classifier.predict_batch(chunk.loc[~known, "Details"], top_n=1)
+        confident = predictions["Confidence_1"].astype(float) >= threshold
+        out.loc[~known, "Category"] = predictions["Category_1"]
+        out.loc[~known, "Confidence"] = predictions["Confidence_1"].astype(float)
+        out.loc[~known, "Source"] = (
+            predictions["Source"].where(predictions["Source"] == "vendor", "auto").where(confident, "review")
+        )
+    return out[OUTPUT_COLUMNS]
+
+
+def classify_file(input_path, output_path, chunksize=CLI_CHUNK_SIZE, threshold=AUTO_CLASSIFY_THRESHOLD, classifier=None):
+    """Stream `input_path` through the classifier into `output_path`. Returns (rows, seconds)."""
+    classifier = classifier or ExpenseClassifier()
+    start = time.perf_counter()
+    rows = 0
+    dtypes = amount_dtypes(input_path, chunksize)  # One pass over Amount/Balance only
+    with open(output_path, "w", newline="") as out:
+        for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize, dtype=dtypes)):
+            classify_chunk(classifier, chunk, threshold).to_csv(out, index=False, header=(i == 0))
+            rows += len(chunk)
+            elapsed = time.perf_counter() - start
+            logging.info(f"Classified {rows} rows ({rows / elapsed:,.0f} rows/s)")
+        if rows == 0:
+            out.write(",".join(OUTPUT_COLUMNS) + "\n")
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a bank export without the GUI.")
+    parser.add_argument("input", help="CSV export to classify")
+    parser.add_argument("-o", "--output", required=True, help="CSV file for UID/Category/Confidence/Source rows")
+    parser.add_argument("--chunksize", type=int, default=CLI_CHUNK_SIZE, help="Rows read and classified per batch")
+    parser.add_argument("--threshold", type=float, default=AUTO_CLASSIFY_THRESHOLD,
+                        help="Confidence needed to mark a prediction 'auto' rather than 'review'")
+    args = parser.parse_args(argv)
+
+    rows, seconds = classify_file(args.input, args.output, args.chunksize, args.threshold)
+    rate = rows / seconds if seconds > 0 else 0.0
+    print(f"{rows} rows classified in {seconds:.2f}s ({rate:,.0f} rows/s) -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# compact.py
+#
+# Compact in-memory forms of the classification map and transaction frames, plus a memory report:
+#
+#   python compact.py [classification_file]
+
+import math
+import sys
+from collections.abc import Mapping
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ("Details", "CleanDetails", "NormDetails", "Category", "Source")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ClassificationRecord(Mapping):
+    """
+    One classification (Description/Category/Source/Date/Amount) in a slotted object instead of a dict.
+    Strings are interned so repeated descriptions, categories, sources and dates share one object,
+    and the amount is held as integer cents. Reads behave like the original entry dict
+    (get, [], keys, items, ** unpacking), with Amount returned as dollars.
+    """
+
+    __slots__ = ("description", "category", "source", "date", "amount_cents")
+
+    FIELDS = ("Description", "Category", "Source", "Date", "Amount")
+
+    def __init__(self, description=None, category=None, source=None, date=None, amount=None):
+        self.description = _intern(description)
+        self.category = _intern(category)
+        self.source = _intern(source)
+        self.date = _intern(date)
+        self.amount_cents = _to_cents(amount)
+
+    @classmethod
+    def from_entry(cls, entry):
+        if isinstance(entry, cls):
+            return entry
+        return cls(entry.get("Description"), entry.get("Category"), entry.get("Source"), entry.get("Date"), entry.get("Amount"))
+
+    def __getitem__(self, key):
+        if key == "Description":
+            return self.description
+        if key == "Category":
+            return self.category
+        if key == "Source":
+            return self.source
+        if key == "Date":
+            return self.date
+        if key == "Amount":
+            return None if self.amount_cents is None else self.amount_cents / 100
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"ClassificationRecord({self.to_dict()!r})"
+
+
+def _to_cents(amount):
+    if amount is None:
+        return None
+    amount = float(amount)
+    return None if math.isnan(amount) else round(amount * 100)
+
+
+def compact_classifications(classifications):
+    """Convert a UID -> entry dict to UID -> ClassificationRecord in place (UIDs are interned too)."""
+    records = {sys.intern(uid): ClassificationRecord.from_entry(entry) for uid, entry in classifications.items()}
+    classifications.clear()
+    classifications.update(records)
+    return classifications
+
+
+def json_default(value):
+    """json.dump hook so stores can write ClassificationRecord values like plain dicts."""
+    if isinstance(value, ClassificationRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def compact_frame(df, columns=CATEGORICAL_COLUMNS):
+    """Dictionary-encode repetitive string columns (category dtype) in place; other columns are untouched."""
+    for column in columns:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    return df
+
+
+# --- Memory report ---
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by a container tree, counting shared objects once."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif isinstance(obj, ClassificationRecord):
+        size += sum(deep_sizeof(getattr(obj, slot), seen) for slot in ClassificationRecord.__slots__)
+    return size
+
+
+def _copy(value):
+    # A distinct object, as json.load would produce for each occurrence
+    return "".join(list(value)) if isinstance(value, str) and len(value) > 1 else value
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+
+def memory_report(classifications, history=None, transactions=None):
+    """
+    Bytes used by the classification map and frames in their current form versus the
+    plain representation (dict entries, object string columns). Returns rows of name/plain/compact.
+    """
+    # As parsed from JSON: keys shared, but every entry owns its dict and value strings
+    keys = set(map(id, ClassificationRecord.FIELDS))
+    plain = sys.getsizeof(dict(classifications)) + sum(
+        sys.getsizeof(uid) + deep_sizeof({field: _copy(value) for field, value in entry.items()}, set(keys))
+        for uid, entry in classifications.items()
+    )
+    rows = [{"name": "classifications", "plain": plain, "compact": deep_sizeof(classifications)}]
+    for name, df in (("classified history", history), ("transactions", transactions)):
+        if df is None or df.empty:
+            continue
+        plain = df.copy()
+        for column in plain.columns:
+            if isinstance(plain[column].dtype, pd.CategoricalDtype):
+                plain[column] = plain[column].astype(object)
+        rows.append({"name": name, "plain": frame_bytes(plain), "compact": frame_bytes(df)})
+    return rows
+
+
+def format_memory_report(rows):
+    lines = [f"{'Structure':<22} {'Plain MB':>10} {'Compact MB':>11} {'Saved':>7}"]
+    for r in rows:
+        saved = 1 - r["compact"] / r["plain"] if r["plain"] else 0.0
+        lines.append(f"{r['name']:<22} {r['plain'] / 2**20:>10.1f} {r['compact'] / 2**20:>11.1f} {saved:>7.0%}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from classification_store import JsonClassificationStore
+    from config import CLASSIFICATION_FILE
+    from history_snapshot import HistorySnapshot
+
+    store = JsonClassificationStore(sys.argv[1] if len(sys.argv) > 1 else CLASSIFICATION_FILE)
+    history = HistorySnapshot(store, path=None).load()
+    print(format_memory_report(memory_report(compact_classifications(store.load_all()), history)))
@@ -14,10 +14,50 @@ logging.basicConfig(
     ]
 )
 
+# Diagnostics
+PERF_STATS_ENABLED = False  # Record call counts/latencies of hot paths (adds a Diagnostics tab, report on exit)
+PERF_REPORT_FILE = "perf_report.json"  # JSON report written on exit when stats are enabled (None to skip)
+
 # File paths
 CLASSIFICATION_FILE = "data/expense_classifications.json"
+SQLITE_FILE = "data/expense_classifications.db"
+STORAGE_BACKEND = "json"  # "json" (single file) or "sqlite" (indexed, per-row writes; migrates the JSON file on first use; needed by inbox_watcher.py)
+WRITE_BEHIND_DELAY_MS = 2000  # Idle time after the last confirmation before pending saves are flushed
+WRITE_BEHIND_MAX_PENDING = 200  # Flush immediately once this many classification changes are pending
+MODEL_CACHE_FILE = "data/model_cache.pkl"  # Fitted model artifact reused at startup when training data is unchanged
+HISTORY_SNAPSHOT_FILE = "data/classified_history.feather"  # Columnar copy for analytics (needs pyarrow; None to disable)
+INGEST_WORKERS = None  # Processes used by "Load Folder" (None = one per CPU)
+INGEST_EXTENSIONS = (".csv", ".xlsx")  # Export files picked up from a folder
+INBOX_DIR = "data/inbox"  # Folder polled by inbox_watcher.py for new exports
+INBOX_STATE_FILE = "data/inbox_state.json"  # Sizes, hashes and row counts of inbox files already ingested
+INBOX_REVIEW_FILE = "data/inbox_review.csv"  # Inbox rows below the auto-classify threshold, kept for manual review
+INBOX_POLL_SECONDS = 30
+INBOX_SETTLE_SECONDS = 5  # Skip files modified this recently (download still in progress)
+CLI_CHUNK_SIZE = 50000  # Rows per batch in classify_cli.py (bounds its memory use)
+CHART_CACHE_SIZE = 64  # Prepared chart datasets kept by the Analytics tab (keyed by chart settings + data version)
 # EXPENSE_CATEGORIES_FILE = "assets/expense_categories.json"
 CONFIDENCE_THRESHOLD = 0.8  # Set threshold for high-confidence classification
 FUZZY_MATCH_THRESHOLD = 70  # Set a default threshold for fuzzy matching (RapidFuzz scores are 0 to 100)
+FUZZY_CLUSTER_WORKERS = -1  # Threads for the whole-file clustering pass (-1 = all cores)
+FUZZY_CLUSTER_CHUNK = 1000  # Descriptions scored per cdist call (bounds the score matrix memory)
+FUZZY_GROUP_LIMIT = 5  # Distinct descriptions per group (the leader and its best matches); the rest go to later groups
+FUZZY_GROUP_PAGE = 20  # Rows shown per group at once; the rest of a large group follows once these are confirmed
 AUTO_CLASSIFY_THRESHOLD = 0.90  # Set threshold for auto-classification
-IGNORED_TERMS = {"pos"} # Stopwords for classification
\ No newline at end of file
+IGNORED_TERMS = {"pos"} # Stopwords for classification
+VENDOR_MIN_COUNT = 1  # Manual labels needed before an exact description match bypasses the model
+VENDOR_MIN_CONSISTENCY = 0.9  # Share of those labels that must agree on one category
+
+# Model training
+INCREMENTAL_TRAINING = False  # Opt-in: update the model with new manual classifications instead of refitting from scratch (hashed features, slightly less accurate)
+FULL_REBUILD_INTERVAL = 500  # Incremental updates allowed before a full rebuild (0 disables periodic rebuilds)
+HASHING_FEATURES = 2 ** 18  # Size of the stateless hashed feature space used in incremental mode
+PREDICTION_CACHE_SIZE = 10000  # Max cached single-description predictions (keyed by cleaned text + model version)
+HASHING_ALPHA = 0.01  # Naive Bayes smoothing for hashed features (alpha=1 over 2**18 buckets flattens every class)
+CLASSIFIER_ENGINE = "nb"  # "nb" (Naive Bayes over word tokens) or "knn" (nearest manual classifications by character n-grams)
+KNN_NEIGHBOURS = 10  # Neighbours voting on a kNN prediction
+KNN_WEIGHT_POWER = 4  # Votes are weighted by similarity ** power so close matches dominate distant ones
+KNN_CANDIDATES = 200  # Rows shortlisted per query before exact similarities are computed
+KNN_SHORTLIST_GRAMS = 10  # A query's most distinctive n-grams used to shortlist rows (higher = better recall, slower)
+KNN_NGRAM_RANGE = (3, 4)  # Character n-gram sizes indexed by the kNN engine
+KNN_FEATURES = 2 ** 20  # Hashed n-gram feature space of the kNN engine
+KNN_QUERY_CHUNK = 512  # Queries scored per sparse product (bounds the similarity matrix memory)
@@ -1,80 +1,453 @@
 ## Expense Classifier
 
+import copy
 import logging
-import json
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.preprocessing import LabelEncoder
-from config import CLASSIFICATION_FILE  # Import global settings
-from utils import clean_description  # Import the clean_description function
+from config import (  # Import global settings
+    CLASSIFICATION_FILE, MODEL_CACHE_FILE, INCREMENTAL_TRAINING, FULL_REBUILD_INTERVAL, HASHING_FEATURES, HASHING_ALPHA,
+    PREDICTION_CACHE_SIZE, CLASSIFIER_ENGINE, KNN_NEIGHBOURS, KNN_WEIGHT_POWER, KNN_CANDIDATES, KNN_SHORTLIST_GRAMS,
+    KNN_NGRAM_RANGE, KNN_FEATURES
+)
+from utils import LRUCache
+from text_normalization import clean_description, clean_series
+from vendor_index import VendorIndex
+from knn_engine import CharNgramVectorizer, KNNClassifier
+from compact import ClassificationRecord, compact_classifications
+from perf import timed
+from classification_store import create_store
+from model_cache import (
+    entry_digest, classifications_digest, training_key, save_model_artifact, load_model_artifact, DIGEST_MODULUS
+)
 
 
 class ExpenseClassifier:
-    def __init__(self, classification_file=CLASSIFICATION_FILE):
+    def __init__(self, classification_file=CLASSIFICATION_FILE, incremental=INCREMENTAL_TRAINING,
+                 rebuild_interval=FULL_REBUILD_INTERVAL, model_cache_file=MODEL_CACHE_FILE, store=None,
+                 engine=CLASSIFIER_ENGINE):
+        if engine not in ("nb", "knn"):
+            raise ValueError(f"Unknown classifier engine: {engine!r}")
+        self.engine = engine
         self.classification_file = classification_file
-        self.vectorizer = TfidfVectorizer(stop_words="english")
-        self.classifier = MultinomialNB()
+        self.store = store or create_store(classification_file=classification_file)
+        self._dirty_uids = set()  # UIDs changed in memory since the last write
+        self.model_cache_file = model_cache_file
+        self.incremental = incremental
+        self.rebuild_interval = rebuild_interval
+        self.vectorizer = self._make_vectorizer()
+        self.classifier = self._make_classifier()
         self.label_encoder = LabelEncoder()
+        self.is_trained = False
+        self.model_version = 0  # Bumped every time the fitted model changes
+        self._model_lock = threading.Lock()  # Guards the fitted model against swaps mid-prediction
+        self._trained_labels = {}  # UID -> category the model has learned from
+        self._updates_since_rebuild = 0
+        self._model_unsaved = False  # Incremental updates not yet in the model artifact (saved on rebuild or close)
+        self.prediction_cache = LRUCache(PREDICTION_CACHE_SIZE)
+        self.vendor_index = VendorIndex()
         self._load_classifications()
-        self._train_model()
+        self.vendor_index.build(self.classifications)
+        self._training_digest = classifications_digest(self.classifications)
+        if not self._load_cached_model():
+            self._train_model()
 
 
-    def _train_model(self):
-        """Train the classifier using only manually classified transactions."""
-        if not self.classifications:
+    def _make_vectorizer(self):
+        """Incremental mode needs a stateless feature space so new text never requires a refit."""
+        if self.engine == "knn":
+            return CharNgramVectorizer()  # Hashed, so it suits both modes
+        if self.incremental:
+            return HashingVectorizer(stop_words="english", alternate_sign=False, n_features=HASHING_FEATURES)
+        return TfidfVectorizer(stop_words="english")
+
+
+    def _make_classifier(self):
+        if self.engine == "knn":
+            return KNNClassifier()
+        return MultinomialNB(alpha=HASHING_ALPHA) if self.incremental else MultinomialNB()
+
+
+    def _train_model(self, classifications=None):
+        """
+        Train the classifier using only manually classified transactions.
+        The new model is fitted on a snapshot of the classifications and swapped in atomically,
+        so predictions from other threads keep using the current model until training finishes.
+        """
+        if classifications is None:
+            classifications = self.classifications.copy()
+
+        state = self._build_model(classifications)
+        self._swap_model(state)
+        if state is not None:
+            logging.info(f"Model trained on {len(state['trained_labels'])} manually classified transactions.")
+            self._model_unsaved = True
+            self.save_model()
+
+
+    @timed("classifier.train_full", rows=lambda self, classifications: len(classifications))
+    def _build_model(self, classifications):
+        """Fit a fresh vectorizer/classifier/encoder on the given classifications. Returns None if no training data."""
+        if not classifications:
             logging.warning("No classifications available. Skipping training.")
-            self.is_trained = False
-            return
+            return None
 
         descriptions = []
         categories = []
+        trained_labels = {}
 
-        for entry in self.classifications.values():
+        for uid, entry in classifications.items():
             if entry.get("Source") != "manual":
                 continue  # ✅ Skip auto-classified data
 
-            # descriptions.append(entry["Description"])
-            descriptions.append(clean_description(entry["Description"]))
+            descriptions.append(entry["Description"])
             categories.append(entry["Category"])
+            trained_labels[uid] = entry["Category"]
 
         if not descriptions:
             logging.warning("No manual classifications found. Skipping training.")
-            self.is_trained = False
+            return None
+
+        descriptions = clean_series(pd.Series(descriptions)).tolist()
+
+        vectorizer = self._make_vectorizer()
+        classifier = self._make_classifier()
+        label_encoder = LabelEncoder()
+
+        y_train = label_encoder.fit_transform(categories)
+        X_train = vectorizer.fit_transform(descriptions)
+        classifier.fit(X_train, y_train)
+
+        return {
+            "vectorizer": vectorizer,
+            "classifier": classifier,
+            "label_encoder": label_encoder,
+            "trained_labels": trained_labels,
+            "updates_since_rebuild": 0,
+            "training_digest": classifications_digest(classifications),
+        }
+
+
+    def _swap_model(self, state):
+        """Atomically replace the fitted model (or mark it untrained when state is None)."""
+        with self._model_lock:
+            if state is None:
+                self.is_trained = False
+            else:
+                self.vectorizer = state["vectorizer"]
+                self.classifier = state["classifier"]
+                self.label_encoder = state["label_encoder"]
+                self._trained_labels = state["trained_labels"]
+                self._updates_since_rebuild = state["updates_since_rebuild"]
+                self._training_digest = state["training_digest"]
+                self.is_trained = True
+            self.model_version += 1
+            self.prediction_cache.clear()  # Entries keyed on the old version can never hit again
+
+
+    def _model_settings(self):
+        """Settings that change the fitted artifact; part of the cache key."""
+        if self.engine == "knn":
+            return {
+                "engine": self.engine,
+                "neighbours": KNN_NEIGHBOURS,
+                "weight_power": KNN_WEIGHT_POWER,
+                "candidates": KNN_CANDIDATES,
+                "shortlist_grams": KNN_SHORTLIST_GRAMS,
+                "ngram_range": tuple(KNN_NGRAM_RANGE),
+                "features": KNN_FEATURES,
+            }
+        return {
+            "incremental": self.incremental,
+            "hashing_features": HASHING_FEATURES if self.incremental else None,
+            "alpha": self.classifier.alpha,
+        }
+
+
+    def _load_cached_model(self):
+        """Restore the fitted model from the artifact cache. Returns True on a cache hit."""
+        if not self.model_cache_file:
+            return False
+
+        key = training_key(self._training_digest, self._model_settings())
+        state = load_model_artifact(self.model_cache_file, key)
+        if state is None:
+            return False
+
+        state["training_digest"] = self._training_digest
+        self._swap_model(state)
+        logging.info(f"Loaded cached model trained on {len(self._trained_labels)} manual classifications.")
+        return True
+
+
+    def save_model(self):
+        """
+        Persist the model if it changed since the last save.
+        Only a snapshot is taken under the model lock (shallow copies, no fitted arrays copied);
+        pickling runs outside it so predictions on the GUI thread are never blocked by a save.
+        """
+        if not self.model_cache_file:
+            return
+
+        with self._model_lock:
+            if not self._model_unsaved or not self.is_trained:
+                return
+            key = training_key(self._training_digest, self._model_settings())
+            state = {
+                "vectorizer": self.vectorizer,
+                "classifier": copy.copy(self.classifier),  # The artifact writer swaps attributes on what it is given
+                "label_encoder": copy.copy(self.label_encoder),
+                "trained_labels": dict(self._trained_labels),
+                "updates_since_rebuild": self._updates_since_rebuild,
+            }
+            self._model_unsaved = False
+
+        save_model_artifact(self.model_cache_file, key, state)
+
+
+    @timed("classifier.train_incremental")
+    def update_model(self, uids=None):
+        """
+        Incrementally learn manual classifications the model has not seen yet.
+        Only the given UIDs are inspected (all classifications when None), so a single
+        confirmation costs O(new rows). Unseen categories are appended as new classes.
+        """
+        if not self.incremental or not self.is_trained:
+            self._train_model()
+            return
+
+        if uids is None:
+            uids = list(self.classifications.copy())
+
+        pending = []
+        for uid in uids:
+            entry = self.classifications.get(uid)
+            if not entry or entry.get("Source") != "manual":
+                continue
+            if self._trained_labels.get(uid) == entry["Category"]:
+                continue  # Already learned with this label
+            pending.append((uid, entry))
+
+        if not pending:
             return
 
-        self.label_encoder.fit(categories)
-        y_train = self.label_encoder.transform(categories)
-        X_train = self.vectorizer.fit_transform(descriptions)
-        self.classifier.fit(X_train, y_train)
+        X_new = self.vectorizer.transform([clean_description(entry["Description"]) for _, entry in pending])
 
-        self.is_trained = True
-        logging.info(f"Model trained on {len(descriptions)} manually classified transactions.")
+        with self._model_lock:
+            self._add_classes(entry["Category"] for _, entry in pending)
+            class_index = {category: i for i, category in enumerate(self.label_encoder.classes_)}
+            y_new = np.array([class_index[entry["Category"]] for _, entry in pending])
+            self.classifier.partial_fit(X_new, y_new)
+
+            for uid, entry in pending:
+                if uid in self._trained_labels:
+                    previous = {"Description": entry["Description"], "Category": self._trained_labels[uid]}
+                    self._training_digest -= entry_digest(uid, previous)
+                self._training_digest = (self._training_digest + entry_digest(uid, entry)) % DIGEST_MODULUS
+                self._trained_labels[uid] = entry["Category"]
+            self._updates_since_rebuild += len(pending)
+            self.model_version += 1
+            self.prediction_cache.clear()
+            self._model_unsaved = True  # Saved with the next rebuild or on close, not per confirmation
+            logging.info(f"Model updated incrementally with {len(pending)} manual classifications.")
+
+            # Relabelled rows keep their old counts until the next rebuild, so rebuild periodically
+            needs_rebuild = self.rebuild_interval and self._updates_since_rebuild >= self.rebuild_interval
+
+        if needs_rebuild:
+            logging.info("Incremental update limit reached. Rebuilding model from scratch.")
+            self._train_model()
+
+
+    def _add_classes(self, categories):
+        """Grow the label space and the classifier's per-class counts for unseen categories."""
+        known = set(self.label_encoder.classes_)
+        new_categories = sorted(set(categories) - known)
+        if not new_categories:
+            return
+
+        n_new = len(new_categories)
+        self.label_encoder.classes_ = np.concatenate([
+            np.asarray(self.label_encoder.classes_, dtype=object),
+            np.asarray(new_categories, dtype=object)
+        ])
+        self.classifier.classes_ = np.arange(len(self.label_encoder.classes_))
+        if self.engine == "knn":
+            logging.info(f"Added {n_new} new categories to the model: {new_categories}")
+            return  # Label counts grow with the rows added by partial_fit
+        self.classifier.class_count_ = np.concatenate([self.classifier.class_count_, np.zeros(n_new)])
+        self.classifier.feature_count_ = np.vstack([
+            self.classifier.feature_count_,
+            np.zeros((n_new, self.classifier.feature_count_.shape[1]))
+        ])
+        logging.info(f"Added {n_new} new categories to the model: {new_categories}")
 
 
     def _load_classifications(self):
-        with open(self.classification_file, "r") as f:
-            self.classifications = json.load(f)
+        # Slotted records with interned strings: a fraction of the memory of one dict per entry
+        self.classifications = compact_classifications(self.store.load_all())
+
 
+    def set_classification(self, uid, entry):
+        """Store a classification in memory and keep the vendor memory in step with it."""
+        entry = ClassificationRecord.from_entry(entry)
+        self.classifications[uid] = entry
+        self.vendor_index.update(uid, entry)
+        self._dirty_uids.add(uid)
 
-    def save_classifications(self):
-        """Save the current classifications to file and retrain the model."""
-        with open(self.classification_file, "w") as f:
-            json.dump(self.classifications, f, indent=4)
-        self._train_model()
-        logging.info("Classifications saved and model retrained.")
 
+    @property
+    def has_unsaved_changes(self):
+        return bool(self._dirty_uids)
 
+
+    @timed("classifier.write_classifications")
+    def write_classifications(self):
+        """Persist changed classifications without touching the model (per-row upserts where the store supports it)."""
+        dirty, self._dirty_uids = self._dirty_uids, set()
+        if dirty:
+            self.store.write(self.classifications, dirty)
+
+
+    def save_classifications(self, uids=None):
+        """
+        Save the current classifications to file and bring the model up to date.
+        In incremental mode only the given UIDs (or any unseen manual rows) are learned.
+        """
+        self.write_classifications()
+        if self.incremental:
+            self.update_model(uids)
+        else:
+            self._train_model()
+        logging.info("Classifications saved and model updated.")
+
+
+    @timed("classifier.predict_single", rows=1)
     def predict_category(self, transaction_detail, top_n=3):
-        """Predicts the expense category for a transaction."""
-        if not getattr(self, "is_trained", False):
-            logging.warning("Prediction attempted before training. Returning empty prediction.")
-            return []
+        """
+        Predicts the expense category for a transaction.
+        Descriptions already classified manually are answered from the vendor memory; model
+        results are memoized on (cleaned description, top_n, model version), so repeated
+        merchant strings are only scored once per model.
+        """
+        cleaned = clean_description(transaction_detail)
+
+        vendor_predictions = self.vendor_index.lookup(cleaned, top_n)
+        if vendor_predictions is not None:
+            return vendor_predictions
+
+        with self._model_lock:
+            if not self.is_trained:
+                logging.warning("Prediction attempted before training. Returning empty prediction.")
+                return []
+
+            key = (cleaned, top_n, self.model_version)
+            cached = self.prediction_cache.get(key)
+            if cached is not None:
+                return list(cached)
+
+            # X_test = self.vectorizer.transform([transaction_detail])
+            X_test = self.vectorizer.transform([cleaned])
+            probabilities = self._predict_proba(X_test)
+            indices, scores = self._top_n(probabilities, top_n)
+            categories = self.label_encoder.classes_[indices[0]]
+
+            predictions = tuple(zip(categories, scores[0]))
+            self.prediction_cache.put(key, predictions)
+
+        return list(predictions)
+
+
+    def prediction_cache_stats(self):
+        """Hit/miss counters for the single-prediction cache."""
+        return self.prediction_cache.stats()
+
+
+    @timed("classifier.predict_batch", rows=lambda self, descriptions, *a, **k: len(descriptions))
+    def predict_batch(self, descriptions, top_n=3, cleaned=False):
+        """
+        Predict categories for many descriptions at once.
+        Returns a DataFrame aligned to the input index with Category_i / Confidence_i
+        columns for the top_n predictions (best first) plus a Source column ('vendor' for
+        exact-match vendor memory hits, 'model' otherwise), ready to join back onto the source frame.
+        Pass cleaned=True when the descriptions are already clean_description output (e.g. CleanDetails).
+        """
+        descriptions = pd.Series(descriptions)
+        columns = [f"{prefix}_{i + 1}" for i in range(top_n) for prefix in ("Category", "Confidence")]
+        result = pd.DataFrame(index=descriptions.index, columns=columns + ["Source"])
+        if descriptions.empty:
+            return result
+
+        cleaned = descriptions.tolist() if cleaned else clean_series(descriptions).tolist()
+        categories = np.full((len(cleaned), top_n), None, dtype=object)
+        scores = np.full((len(cleaned), top_n), np.nan)
+        sources = np.full(len(cleaned), None, dtype=object)
+
+        # First pass: O(1) exact-match lookups; only the misses go to the model
+        model_rows = []
+        for i, text in enumerate(cleaned):
+            vendor_predictions = self.vendor_index.lookup(text, top_n)
+            if vendor_predictions is None:
+                model_rows.append(i)
+                continue
+            for j, (category, share) in enumerate(vendor_predictions):
+                categories[i, j] = category
+                scores[i, j] = share
+            sources[i] = "vendor"
+
+        with self._model_lock:
+            if model_rows and not self.is_trained:
+                logging.warning("Batch prediction attempted before training. Returning vendor matches only.")
+            elif model_rows:
+                X_test = self.vectorizer.transform([cleaned[i] for i in model_rows])
+                probabilities = self._predict_proba(X_test)
+                indices, model_scores = self._top_n(probabilities, top_n)
+                width = indices.shape[1]
+                categories[model_rows, :width] = self.label_encoder.classes_[indices]
+                scores[model_rows, :width] = model_scores
+                sources[model_rows] = "model"
+
+        for i in range(top_n):
+            result[f"Category_{i + 1}"] = categories[:, i]
+            result[f"Confidence_{i + 1}"] = scores[:, i]
+        result["Source"] = sources
+        return result
+
+
+    def _predict_proba(self, X):
+        """
+        Naive Bayes class probabilities computed over only the feature columns present in X.
+        MultinomialNB.predict_proba multiplies against the full (classes x features) matrix,
+        which with 2**18 hashed features costs tens of milliseconds even for a single row.
+        The kNN engine returns its neighbour-vote confidences instead.
+        """
+        if self.engine == "knn":
+            return self.classifier.predict_proba(X)
+        X = X.tocsr()
+        columns = np.unique(X.indices)
+        log_prob = self.classifier.feature_log_prob_[:, columns]
+        jll = np.asarray(X[:, columns] @ log_prob.T) + self.classifier.class_log_prior_
+        jll -= jll.max(axis=1, keepdims=True)
+        probabilities = np.exp(jll)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+
 
-        # X_test = self.vectorizer.transform([transaction_detail])
-        X_test = self.vectorizer.transform([clean_description(transaction_detail)])
-        probabilities = self.classifier.predict_proba(X_test)[0]
-        category_indices = np.argsort(probabilities)[::-1][:top_n]
+    @staticmethod
+    def _top_n(probabilities, top_n):
+        """Return (indices, scores) of the top_n classes per row, sorted by descending probability."""
+        top_n = min(top_n, probabilities.shape[1])
+        if top_n < probabilities.shape[1]:
+            # Partial sort: only the top_n columns per row are ordered afterwards
+            indices = np.argpartition(-probabilities, top_n - 1, axis=1)[:, :top_n]
+        else:
+            indices = np.tile(np.arange(probabilities.shape[1]), (probabilities.shape[0], 1))
 
-        return [(self.label_encoder.inverse_transform([idx])[0], probabilities[idx]) for idx in category_indices]
+        scores = np.take_along_axis(probabilities, indices, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        indices = np.take_along_axis(indices, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        return indices, scores
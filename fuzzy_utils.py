@@ -1,17 +1,15 @@
 # fuzzy_utils.py
 
-import re
 import logging
+from collections import deque
+import numpy as np
 import pandas as pd
 from rapidfuzz import process, fuzz
-from config import FUZZY_MATCH_THRESHOLD
-
-def normalize_text(text):
-    """Return a lowercase, punctuation-free version of the input text."""
-    text = text.lower()
-    text = re.sub(r'[^\w\s]', '', text)
-    return text.strip()
+from config import FUZZY_MATCH_THRESHOLD, FUZZY_CLUSTER_WORKERS, FUZZY_CLUSTER_CHUNK, FUZZY_GROUP_LIMIT, FUZZY_GROUP_PAGE
+from perf import timed
+from text_normalization import normalize_text, normalize_series, NORMALIZED_COLUMN  # normalize_text re-exported
 
+@timed("fuzzy.group_similar", rows=lambda df, *a, **k: len(df))
 def group_similar_transactions(df, target_row, threshold=FUZZY_MATCH_THRESHOLD, limit=5):
     """
     Group transactions with similar 'Details' in a DataFrame using fuzzy matching.
@@ -21,9 +19,14 @@ def group_similar_transactions(df, target_row, threshold=FUZZY_MATCH_THRESHOLD,
     # Normalize the target description
     target = normalize_text(target_row["Details"])
 
-    # Get all unique descriptions and normalize them
-    unique_details = df["Details"].unique()
-    normalized_details = [normalize_text(detail) for detail in unique_details]
+    # Get all unique descriptions and their normalized form (reusing the cached column when present)
+    if NORMALIZED_COLUMN in df.columns:
+        unique_rows = df.drop_duplicates(subset="Details")
+        unique_details = unique_rows["Details"].to_numpy()
+        normalized_details = unique_rows[NORMALIZED_COLUMN].tolist()
+    else:
+        unique_details = df["Details"].unique()
+        normalized_details = normalize_series(pd.Series(unique_details)).tolist()
 
     # Use RapidFuzz to extract matches
     matches = process.extract(
@@ -48,3 +51,91 @@ def group_similar_transactions(df, target_row, threshold=FUZZY_MATCH_THRESHOLD,
     merged_rows = matching_rows.drop_duplicates(subset=["Date", "Details", "Amount", "Balance"])
 
     return merged_rows
+
+
+@timed("fuzzy.cluster_file", rows=lambda df, *a, **k: len(df))
+def cluster_transactions(df, threshold=FUZZY_MATCH_THRESHOLD, workers=FUZZY_CLUSTER_WORKERS, chunk_size=FUZZY_CLUSTER_CHUNK,
+                         limit=FUZZY_GROUP_LIMIT):
+    """
+    Group a whole frame's rows by fuzzy-similar descriptions in one pass.
+    Unique normalized descriptions are scored against each other with RapidFuzz cdist
+    (token_sort_ratio semantics, all cores, chunked to bound memory). Descriptions with the most similar rows
+    become group leaders; each claims its best-scoring still-unassigned neighbours, up to `limit` distinct
+    descriptions per group (like the per-row grouping's limit), and the rest are left for later groups.
+    Returns a list of index-label arrays, largest group first.
+    """
+    if df.empty:
+        return []
+
+    normalized = df[NORMALIZED_COLUMN] if NORMALIZED_COLUMN in df.columns else normalize_series(df["Details"])
+    codes, uniques = pd.factorize(np.asarray(normalized, dtype=object))
+    uniques = list(uniques)
+    n = len(uniques)
+    rows_per_unique = np.bincount(codes, minlength=n)
+
+    # token_sort_ratio is ratio over token-sorted strings: sort each description once, not per pair
+    sorted_tokens = [" ".join(sorted(text.split())) for text in uniques]
+
+    # Neighbour lists (score >= threshold) with their scores as CSR arrays
+    neighbour_rows = []
+    neighbour_cols = []
+    neighbour_scores = []
+    for start in range(0, n, chunk_size):
+        scores = process.cdist(
+            sorted_tokens[start:start + chunk_size], sorted_tokens,
+            scorer=fuzz.ratio, score_cutoff=threshold, dtype=np.uint8, workers=workers
+        )
+        rows, cols = np.nonzero(scores)
+        neighbour_rows.append(rows + start)
+        neighbour_cols.append(cols)
+        neighbour_scores.append(scores[rows, cols])
+    neighbour_rows = np.concatenate(neighbour_rows)
+    neighbours = np.concatenate(neighbour_cols)
+    neighbour_scores = np.concatenate(neighbour_scores)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(neighbour_rows, minlength=n))])
+
+    # Leaders in order of how many rows their neighbourhood covers
+    weight = np.bincount(neighbour_rows, weights=rows_per_unique[neighbours], minlength=n)
+    weight = np.maximum(weight, rows_per_unique)  # Descriptions with no neighbour (e.g. empty) still count themselves
+    group_of = np.full(n, -1)
+    n_groups = 0
+    for leader in np.argsort(-weight, kind="stable"):
+        if group_of[leader] >= 0:
+            continue
+        members = neighbours[indptr[leader]:indptr[leader + 1]]
+        member_scores = neighbour_scores[indptr[leader]:indptr[leader + 1]]
+        free = (group_of[members] < 0) & (members != leader)
+        members = members[free][np.argsort(-member_scores[free], kind="stable")[:limit - 1]]
+        group_of[members] = n_groups
+        group_of[leader] = n_groups
+        n_groups += 1
+
+    row_groups = group_of[codes]
+    order = np.argsort(row_groups, kind="stable")
+    sizes = np.bincount(row_groups, minlength=n_groups)
+    groups = np.split(df.index.to_numpy()[order], np.cumsum(sizes)[:-1])
+    logging.debug(f"Clustered {len(df)} rows ({n} unique descriptions) into {n_groups} groups.")
+    return [groups[g] for g in np.argsort(-sizes, kind="stable")]
+
+
+class GroupQueue:
+    """
+    Clusters from cluster_transactions served largest first. next_group() returns (up to a page of)
+    the current group's still-unclassified rows and moves past groups once they are fully classified.
+    """
+
+    def __init__(self, groups):
+        self._groups = deque(groups)
+
+    def __len__(self):
+        return len(self._groups)
+
+    def next_group(self, df, unclassified, page_size=FUZZY_GROUP_PAGE):
+        """`unclassified` is a boolean mask over df's rows; only the current group's entries are read."""
+        while self._groups:
+            positions = df.index.get_indexer(self._groups[0])
+            positions = positions[unclassified[positions]]
+            if len(positions):
+                return df.iloc[positions].drop_duplicates(subset="UID").head(page_size)
+            self._groups.popleft()
+        return None
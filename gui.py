@@ -2,18 +2,21 @@
 
 import logging
 import os
-import json
 import pandas as pd
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox #, Canvas, Frame
 from app_controller import AppController
-from utils import generate_transaction_id
-from config import AUTO_CLASSIFY_THRESHOLD, CLASSIFICATION_FILE
+from ingest import read_export, format_stats
 from scrollable_frame import ScrollableFrame  # if you saved it separately
-# from matplotlib.figure import Figure
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from analytics import create_spending_vs_transfer_plot, create_spending_category_bar_plot, create_rolling_total_plot, create_rolling_category_plot
-from utils import load_classified_data
+from analytics import (
+    spending_vs_transfer_data, spending_category_data, rolling_total_data, rolling_category_data,
+    draw_spending_vs_transfer, draw_spending_category_bar, draw_rolling_total, draw_rolling_category
+)
+from perf import timed, timer, registry as perf_registry
+from utils import LRUCache
+from config import PERF_STATS_ENABLED, CHART_CACHE_SIZE
 
 BARPLOT_OPTIONS = {
     "Daily" : 1,
@@ -41,18 +44,27 @@ class AppGUI:
         self.master.title("Expense Classifier")
         self.master.geometry("1400x800")
 
+        # Debounced saves run on the Tk event loop; pending saves are flushed on close
+        self.controller.attach_scheduler(self.master)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self.df = None
         self.current_index = 0
 
-        self.controller = AppController()
-
         ## --- Transactions datafrme in memory ---
-        self.classified_df = pd.DataFrame()
-        self.load_classified_transactions()
+        self.classified_df = pd.DataFrame()  # Read from the controller when the Classified tab renders
+
+        # Views patch themselves from repository change events instead of reloading
+        self.summary_shown = False      # Re-render the summary on changes once it has been shown for this file
+        self.explorer_rows = {}         # UID -> (frame, category var, source label) of rendered explorer rows
+        self.explorer_dirty = False
+        self.analytics_dirty = False
+        self.controller.subscribe(self.on_classifications_changed)
 
         ## --- Notebook setup ---
         self.notebook = ttk.Notebook(self.master)
         self.notebook.pack(fill="both", expand=True)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
 
         # --- Classification Tab ---
@@ -66,11 +78,17 @@ class AppGUI:
         # Sidebar buttons
         self.file_btn = tk.Button(self.classification_sidebar, text="Load Transactions", command=self.load_file)
         self.file_btn.pack(pady=10)
+        self.folder_btn = tk.Button(self.classification_sidebar, text="Load Folder", command=self.load_folder)
+        self.folder_btn.pack(pady=(0, 10))
 
         # Progress label
         self.progress_label = ttk.Label(self.classification_sidebar, text="")
         self.progress_label.pack(anchor="e", padx=10, pady=(0, 10))
 
+        # Model status label (active version + background retrain state)
+        self.model_status_label = ttk.Label(self.classification_sidebar, text="", foreground="gray")
+        self.model_status_label.pack(anchor="e", padx=10, pady=(0, 10))
+
         # Cards inside scrollable frame
         self.card_scrollable = ScrollableFrame(self.classify_tab, height=450)
         self.card_scrollable.pack(fill="both", expand=True)
@@ -167,6 +185,13 @@ class AppGUI:
         self.analytics_main = ttk.Frame(self.analytics_frame)
         self.analytics_main.pack(side="right", fill="both", expand=True)
 
+        # One long-lived figure and canvas, redrawn in place for every view
+        self.analytics_figure = Figure(figsize=(8, 5), dpi=100)
+        self.analytics_canvas = FigureCanvasTkAgg(self.analytics_figure, master=self.analytics_main)
+        self.analytics_canvas.get_tk_widget().pack(fill="both", expand=True)
+        # Prepared chart data keyed by (chart, mode, freq/window, start date, cube version)
+        self.analytics_cache = LRUCache(maxsize=CHART_CACHE_SIZE)
+
         # Chart type button
         self.analytics_chart_type = tk.StringVar(value="Bar")
 
@@ -254,13 +279,63 @@ class AppGUI:
         )
         refresh_button.pack(pady=(10, 0))
 
+        # --- Diagnostics tab (only when performance stats are enabled in config.py) ---
+        if PERF_STATS_ENABLED:
+            self.diagnostics_tab = ttk.Frame(self.notebook)
+            self.notebook.add(self.diagnostics_tab, text="Diagnostics")
+
+            ttk.Button(
+                self.diagnostics_tab,
+                text="Refresh Report",
+                command=self.update_diagnostics
+            ).pack(anchor="w", padx=10, pady=10)
+
+            self.diagnostics_text = tk.Text(self.diagnostics_tab, font=("Courier", 11), wrap="none")
+            self.diagnostics_text.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
         # Render initial tab outputs
         self.render_classified_transactions()
         self.update_analytics_main()
+        self.poll_model_status()
 
     # --- Database functions ---
     def load_classified_transactions(self):
-        self.classified_df = load_classified_data()
+        # In-memory frame owned by the controller's repository; no disk read
+        self.classified_df = self.controller.load_classified_data()
+
+    def on_classifications_changed(self, changes):
+        """Apply a batch of repository changes to each view without recomputing it from scratch."""
+        # classified_df is not reloaded here: reading the history appends its buffered rows (a full
+        # frame copy), so that waits until the Classified tab renders
+        if any(self.controller.is_in_file(c.uid) for c in changes):
+            # The controller's unclassified mask and file cube are already patched by the same event
+            self.refresh_progress_label()
+            if self.summary_shown:
+                self.render_summary()
+
+        for c in changes:
+            row = self.explorer_rows.get(c.uid)
+            if c.kind == "updated" and row is not None:
+                frame, category_var, source_label = row
+                category_var.set(c.new.get("Category"))
+                source_label.config(text=c.new.get("Source", ""))
+                frame.config(style="Highlight.TFrame")
+            else:
+                self.explorer_dirty = True  # New rows change ordering/filters; re-render when shown
+
+        self.analytics_dirty = True
+        self.refresh_visible_tab()
+
+    def on_tab_changed(self, event=None):
+        self.refresh_visible_tab()
+
+    def refresh_visible_tab(self):
+        """Re-render a tab marked dirty by change events, but only once it is on screen."""
+        selected = self.notebook.select()
+        if self.explorer_dirty and selected == str(self.reclassify_tab):
+            self.render_classified_transactions()
+        elif self.analytics_dirty and selected == str(self.analytics_tab):
+            self.update_analytics_main()
 
     # Sidebar toggle functions
     def update_frequency_options(self):
@@ -288,23 +363,18 @@ class AppGUI:
             self.show_credit_toggle.pack_forget()
 
 
+    @timed("gui.render_summary")
     def show_summary(self):
         if self.df is None:
             messagebox.showinfo("No data", "Please load a transaction file first.")
             return
 
-        # Add UID and Category columns
-        self.df["UID"] = self.df.apply(generate_transaction_id, axis=1)
-        classifications = self.controller.classifier.classifications
-        self.df["Category"] = self.df["UID"].map(
-            lambda uid: classifications.get(uid, {}).get("Category", "Unclassified")
-        )
+        # Totals come from the file's day x category cube; later classifications patch it via change events
+        self.summary_shown = True
+        self.render_summary()
 
-        # Group and summarize
-        summary_df = self.df.groupby("Category").agg(
-            TotalAmount=("Amount", "sum"),
-            Count=("Amount", "count")
-        ).reset_index().sort_values(by="TotalAmount", ascending=False)
+    def render_summary(self):
+        summary_df = self.controller.get_file_cube().category_totals()
 
         # Clear previous summary display
         for widget in self.summary_main.winfo_children():
@@ -331,73 +401,109 @@ class AppGUI:
         tree.pack(fill="x", padx=10)
 
 
+    @timed("gui.update_progress")
     def update_progress_label(self):
         if self.df is None:
             self.progress_label.config(text="No data loaded.")
             return
+        self.refresh_progress_label()
 
-        total = len(self.df)
+    def refresh_progress_label(self):
+        # The controller's unclassified mask is kept current by change events, so this is O(1)
+        total = len(self.df) if self.df is not None else 0
+        classified = self.controller.classified_count
+        percent = int(100 * classified / total) if total else 0
+        self.progress_label.config(text=f"Classified {classified} of {total} transactions ({percent}%)")
 
-        # Generate all UIDs from current file
-        file_uids = set(self.df.apply(generate_transaction_id, axis=1))
+    def index_loaded_file(self):
+        """Reset the per-file views after a new file is loaded."""
+        self.summary_shown = False
+        self.update_progress_label()
 
-        # Count how many of those have been classified
-        classified_uids = set(self.controller.classifier.classifications.keys())
-        classified = len(file_uids & classified_uids)  # intersection
 
-        percent = int(100 * classified / total) if total else 0
-        self.progress_label.config(text=f"Classified {classified} of {total} transactions ({percent}%)")
+    def on_close(self):
+        self.controller.close()
+        self.master.destroy()
+
+
+    def update_diagnostics(self):
+        self.diagnostics_text.delete("1.0", "end")
+        self.diagnostics_text.insert("1.0", perf_registry.format_report() + "\n\n" + self.controller.get_memory_report())
+
+
+    def poll_model_status(self):
+        """Refresh the model status label; retraining happens on a background thread."""
+        version, in_flight = self.controller.get_model_status()
+        status = "retraining…" if in_flight else "up to date"
+        cache = self.controller.get_prediction_cache_stats()
+        vendor = self.controller.get_vendor_stats()
+        self.model_status_label.config(
+            text=(
+                f"Model v{version} ({status})\n"
+                f"Prediction cache: {cache['hits']} hits / {cache['misses']} misses\n"
+                f"Vendor memory: {vendor['hits']} hits / {vendor['misses']} misses"
+            )
+        )
+        self.master.after(500, self.poll_model_status)
 
 
     def load_file(self):
         logging.debug("Loading transaction file...")    
         file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx")])
         if file_path:
-            if file_path.endswith(".csv"):
-                self.df = pd.read_csv(file_path)
-            else:
-                self.df = pd.read_excel(file_path)
             # Pass the loaded DataFrame to the controller
-            self.controller.set_transactions_df(self.df)
+            self.controller.set_transactions_df(read_export(file_path))
+            self.df = self.controller.df
+            self.index_loaded_file()
             self.current_index = 0
             self.show_next_transaction()
 
             # self.controller.show_common_tokens()
 
+    def load_folder(self):
+        folder = filedialog.askdirectory(title="Select a folder of bank exports")
+        if not folder:
+            return
+        self.master.config(cursor="watch")
+        self.master.update_idletasks()
+        try:
+            stats = self.controller.load_folder(folder)
+        finally:
+            self.master.config(cursor="")
+
+        if not stats:
+            messagebox.showinfo("Load Folder", "No CSV or XLSX exports found in that folder.")
+            return
+        logging.info("Folder load:\n" + format_stats(stats))
 
-    def auto_classify_row(self, transaction):
-        uid = generate_transaction_id(transaction)
-
-        if uid in self.controller.classifier.classifications:
-            return False  # Already classified
-
-        predictions = self.controller.get_prediction(transaction["Details"])
-        if not predictions:
-            return False  # No model trained or no prediction available
-
-        top_category, top_conf = predictions[0]
-        if top_conf >= AUTO_CLASSIFY_THRESHOLD:
-            self.controller.classifier.classifications[uid] = {
-                "Description": transaction["Details"],
-                "Category": top_category,
-                "Source": "auto",
-                "Date": transaction["Date"],
-                "Amount": transaction["Amount"]
-            }
-            return True
+        if self.controller.df is None or not any(s["rows"] for s in stats):
+            messagebox.showerror("Load Folder", "None of the exports could be read.")
+            return
+        self.df = self.controller.df
+        self.index_loaded_file()
+        self.current_index = 0
+        self.show_next_transaction()
 
-        return False
+        loaded = sum(s["rows"] for s in stats)
+        failed = [s["file"] for s in stats if s["error"]]
+        summary = f"{len(stats)} files, {loaded} rows, {len(self.df)} after removing overlaps."
+        if failed:
+            summary += f"\nCould not read: {', '.join(failed)}"
+        messagebox.showinfo("Load Folder", summary)
 
 
     ## --- Classification tab functions ---
+    @timed("gui.render_cards", rows=lambda self, merged_rows: len(merged_rows))
     def display_transaction_cards(self, merged_rows):
         # Clear old cards
         for widget in self.card_frame.winfo_children():
             widget.destroy()
 
+        existing_categories = self.controller.repository.categories()
+
         for _, r in merged_rows.iterrows():
-            uid = generate_transaction_id(r)
-            if uid in self.controller.classifier.classifications:
+            uid = r["UID"]
+            if uid in self.controller.repository.classifications:
                 continue
 
             predictions = self.controller.get_prediction(r["Details"])[:2]
@@ -427,11 +533,6 @@ class AppGUI:
 
             ttk.Label(manual_frame, text="Manual:").grid(row=0, column=0)
 
-            existing_categories = sorted(set(
-                entry["Category"]
-                for entry in self.controller.classifier.classifications.values()
-            ))
-
             category_box = ttk.Combobox(manual_frame, values=existing_categories, state="normal", width=18)
             category_box.set("Select a category")
             category_box.grid(row=0, column=1, padx=5)
@@ -443,41 +544,26 @@ class AppGUI:
             ).grid(row=0, column=2, padx=(5, 0))
 
 
+    @timed("gui.next_group")
     def show_next_transaction(self):
         # STEP 1: Get rows from current file
         if self.df is None:
             return
 
-        # STEP 2: Generate UIDs from the current file
-        file_uids = self.df.apply(generate_transaction_id, axis=1)
-        classified_uids = set(self.controller.classifier.classifications.keys())
-
-        # STEP 3: Filter to only unclassified rows
-        unclassified_df = self.df[~file_uids.isin(classified_uids)]
+        # STEP 2: Auto-classify the file's unclassified rows that qualify (one batch prediction)
+        auto_classified = self.controller.auto_classify_transactions()
 
-        # STEP 4: Auto-classify those that qualify
-        auto_classified = []
-        for _, row in unclassified_df.iterrows():
-            if self.auto_classify_row(row):
-                auto_classified.append(generate_transaction_id(row))
-
-        # STEP 5: Save new auto classifications (if any)
+        # STEP 3: Save new auto classifications (if any); the progress label follows the change event
         if auto_classified:
-            self.controller.save_classifications()
-            self.update_progress_label()
-
-            # Refresh classification after saving
-            classified_uids = set(self.controller.classifier.classifications.keys())
-            file_uids = self.df.apply(generate_transaction_id, axis=1)
-            unclassified_df = self.df[~file_uids.isin(classified_uids)]
+            self.controller.save_classifications(auto_classified)
+            self.controller.flush_classifications()  # One batch write for the whole file
 
-        # STEP 6: Handle completion or show next group
-        if unclassified_df.empty:
+        # STEP 4: Handle completion or show the next (largest remaining) group from the file's clusters
+        merged_rows = self.controller.get_next_group() if self.controller.unclassified_count else None
+        if merged_rows is None:
             messagebox.showinfo("Complete", "All transactions classified!")
             return
 
-        row = unclassified_df.iloc[0]
-        merged_rows = self.controller.get_grouped_transactions(row)
         self.current_group = merged_rows
         self.display_transaction_cards(merged_rows)
 
@@ -487,27 +573,24 @@ class AppGUI:
             messagebox.showwarning("Invalid", "Please enter or select a category.")
             return
 
-        uid = generate_transaction_id(transaction)
-        self.controller.classifier.classifications[uid] = {
+        uid = transaction["UID"]
+        self.controller.set_classification(uid, {
             "Description": transaction["Details"],
             "Category": selected_category.strip(),
             "Source": "manual",
             "Date": transaction["Date"],
             "Amount": transaction["Amount"]
-        }
+        })
 
-        self.controller.save_classifications()
-        self.update_progress_label()
+        self.controller.save_classifications([uid])
         # messagebox.showinfo("Confirmed", f"Transaction classified as '{selected_category}'.")
 
         # ✅ Check if all transactions in the current group are now classified
 
-        all_classified = all(
-            generate_transaction_id(row) in self.controller.classifier.classifications
-            for _, row in self.current_group.iterrows()
-        )
+        all_classified = self.controller.is_group_classified(self.current_group)
 
         if all_classified:
+            self.controller.flush_classifications()  # Group done: write the batch now
             self.current_index += 1  # Advance target index only when group is done
             self.show_next_transaction()
         else:
@@ -515,14 +598,16 @@ class AppGUI:
             self.display_transaction_cards(self.current_group)
 
     # --- Analytics tab functions --- 
+    @timed("gui.render_analytics")
     def update_analytics_main(self):
-        # Clear current chart area
-        for widget in self.analytics_main.winfo_children():
-            widget.destroy()
-
-        df = self.classified_df.copy()
-        if df.empty:
-            ttk.Label(self.analytics_main, text="No data available.").pack()
+        fig = self.analytics_figure
+        fig.clear()
+        self.analytics_dirty = False
+
+        # Daily totals per category, kept current by the repository; charts derive from it in O(days)
+        cube = self.controller.repository.spending_cube()
+        if cube.empty:
+            self.show_analytics_message("No data available.")
             return
 
         chart_type = self.analytics_chart_type.get()
@@ -549,33 +634,54 @@ class AppGUI:
         if chart_type == "Bar":
             freq = bar_freq_map.get(view_mode, 7)
             if display_mode == "Total Spend":
-                fig = create_spending_vs_transfer_plot(df, freq=freq, start_date=start_date, show_credit=show_credit)
+                prepare = lambda: spending_vs_transfer_data(cube, freq=freq, start_date=start_date)
+                draw = lambda data: draw_spending_vs_transfer(fig, data, freq=freq, start_date=start_date, show_credit=show_credit)
             else:
-                fig = create_spending_category_bar_plot(df, freq=freq, start_date=start_date)
+                prepare = lambda: spending_category_data(cube, freq=freq, start_date=start_date)
+                draw = lambda data: draw_spending_category_bar(fig, data, freq=freq)
+            key = (chart_type, display_mode, freq, start_date, cube.version)
 
         elif chart_type == "Line":
             window = rolling_map.get(view_mode, 7)
             if display_mode == "Total Spend":
-                fig = create_rolling_total_plot(df, window=window, start_date=start_date)
+                prepare = lambda: rolling_total_data(cube, window=window)
+                draw = lambda data: draw_rolling_total(fig, data, window=window)
             else:
-                fig = create_rolling_category_plot(df, window=window, start_date=start_date)
+                prepare = lambda: rolling_category_data(cube, window=window)
+                draw = lambda data: draw_rolling_category(fig, data, window=window)
+            key = (chart_type, display_mode, window, None, cube.version)  # Rolling charts ignore the start date
 
         else:
-            ttk.Label(self.analytics_main, text="Invalid chart type selected.").pack()
+            self.show_analytics_message("Invalid chart type selected.")
             return
 
-        # Render the figure
-        canvas = FigureCanvasTkAgg(fig, master=self.analytics_main)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        # show_credit only changes what is drawn, so both views share one cached dataset.
+        # The cube version changes with every classification, so stale entries are never hit.
+        data = self.analytics_cache.get(key)
+        if data is None:
+            with timer("gui.prepare_chart"):
+                data = prepare()
+            self.analytics_cache.put(key, data)
+
+        with timer("gui.draw_chart"):
+            draw(data)
+            self.analytics_canvas.draw()
+
+    def show_analytics_message(self, text):
+        self.analytics_figure.text(0.5, 0.5, text, ha="center", va="center")
+        self.analytics_canvas.draw()
 
 
     # --- Reclassification/Explorer tab functions ---
+    @timed("gui.render_explorer")
     def render_classified_transactions(self, highlight_uid=None):
         for widget in self.reclassify_main.winfo_children():
             widget.destroy()
+        self.explorer_rows = {}
+        self.explorer_dirty = False
 
-        df = self.classified_df.copy()
+        self.load_classified_transactions()
+        df = self.classified_df
 
         if df.empty:
             ttk.Label(self.reclassify_main, text="No classified transactions found.").pack(pady=10)
@@ -592,17 +698,17 @@ class AppGUI:
         selected_cat = self.reclassify_filter_category.get().strip()
         vendor_search = self.reclassify_filter_vendor.get().lower().strip()
 
-        filtered_df = df.copy()  # fallback if value is invalid
+        # Category filter is answered from the in-memory history (ClassificationRepository.query)
+        filtered_df = self.controller.query_classified(category=selected_cat) if selected_cat else df.copy()
+
+        if vendor_search and not filtered_df.empty:
+            filtered_df = filtered_df[filtered_df["Details"].str.lower().str.contains(vendor_search, regex=False)]
 
         # ✅ Sort by date descending
-        filtered_df = filtered_df.sort_values(by="Date", ascending=False)
-        
-        filtered_df = filtered_df.head(100) # debug - annoying rendering slowness need to limit date range
+        if not filtered_df.empty:
+            filtered_df = filtered_df.sort_values(by="Date", ascending=False)
 
-        if selected_cat:
-            filtered_df = filtered_df[filtered_df["Category"] == selected_cat]
-        if vendor_search:
-            filtered_df = filtered_df[filtered_df["Details"].str.lower().str.contains(vendor_search)]
+        filtered_df = filtered_df.head(100) # debug - annoying rendering slowness need to limit date range
         if filtered_df.empty:
             ttk.Label(self.reclassify_main, text="No transactions match current filters.").pack(pady=10)
             return
@@ -644,38 +750,35 @@ class AppGUI:
                 command=lambda uid=row["UID"], new_cat=category_var: self.update_transaction_category(uid, new_cat.get())
             ).pack(side="left")
 
-            ttk.Label(frame, text=row.get("Source", ""), width=10, foreground="gray").pack(side="left")
+            source_label = ttk.Label(frame, text=row.get("Source", ""), width=10, foreground="gray")
+            source_label.pack(side="left")
+            self.explorer_rows[uid] = (frame, category_var, source_label)
 
 
     def reset_reclassify_filters(self):
         self.reclassify_filter_category.set("")
         self.reclassify_filter_vendor.set("")
-        self.load_classified_transactions()        # ⬅ reloads the JSON into memory
         self.render_classified_transactions()
 
 
     def update_transaction_category(self, uid, new_category):
-        with open(CLASSIFICATION_FILE, "r") as f:
-            classifications = json.load(f)
+        classifications = self.controller.repository.classifications
 
         if uid not in classifications:
             messagebox.showerror("Error", "Transaction not found in classification file.")
             return
 
-        classifications[uid]["Category"] = new_category
-        classifications[uid]["Source"] = "manual"
-
-        with open(CLASSIFICATION_FILE, "w") as f:
-            json.dump(classifications, f, indent=4)
+        # Update through the controller so the model and vendor memory learn the correction;
+        # the change event patches this row in place and marks the other tabs for refresh
+        self.controller.set_classification(uid, {
+            **classifications[uid],
+            "Category": new_category,
+            "Source": "manual"
+        })
+        self.controller.save_classifications([uid])
 
         messagebox.showinfo("Category Updated", f"Transaction updated to '{new_category}'.")
 
-        self.load_classified_transactions()
-        self.render_classified_transactions(highlight_uid=uid)
-
-        # self.load_classified_transactions()        # ⬅ reloads the JSON into memory
-        # self.render_classified_transactions()   # ⬅ re-renders the UI with updated data
-
 if __name__ == "__main__":
     master = tk.Tk()
     controller = AppController()  # ✅ Create the controller first
@@ -0,0 +1,185 @@
+# history_snapshot.py
+
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+from config import HISTORY_SNAPSHOT_FILE
+from utils import classifications_to_frame, atomic_write
+from compact import compact_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Optional: without pyarrow the history is read straight from the store
+    pa = None
+    feather = None
+
+SNAPSHOT_FORMAT_VERSION = 2
+HISTORY_COLUMNS = ["UID", "Date", "Details", "Amount", "Category", "Source"]
+
+
+class HistorySnapshot:
+    """
+    Classified history as a typed DataFrame, kept in memory and mirrored to an uncompressed
+    Feather/Arrow IPC file for fast, memory-mapped startup loads. The file carries the store's
+    fingerprint in its schema metadata; a snapshot whose fingerprint no longer matches
+    (classifications edited elsewhere, or an exit without save()) is rebuilt from the store. Changes
+    are applied to the in-memory frame as they happen; save() writes them out once, when the app closes.
+    Without pyarrow the frame is built from the store and nothing is written.
+    """
+
+    def __init__(self, store, path=HISTORY_SNAPSHOT_FILE):
+        self.store = store
+        self.path = path
+        self._df = None
+        self._uid_index = None  # UID -> row position of the frame's rows when it was built (rebuilt after removals)
+        self._appended_positions = {}  # UID -> row position of rows appended to the frame since
+        self._pending = {}  # UID -> entry of rows not in the frame yet, appended in one concat on the next read
+        self._unsaved = False  # Frame changed since the file was written
+
+    @property
+    def enabled(self):
+        return feather is not None and bool(self.path)
+
+    def load(self):
+        """Classified history with typed columns. Callers should copy before modifying it."""
+        df = self._frame()
+        if self._pending:
+            df = self._append_pending(df)
+        return df
+
+    def _frame(self):
+        """The in-memory frame without the pending rows, read or built on first use."""
+        if self._df is None:
+            self._df = self._read() if self.enabled else None
+            if self._df is None:
+                self._df = _typed(classifications_to_frame(self.store.load_all()))
+                if self.enabled:
+                    self._write()  # Once per stale or missing snapshot, so the next launch maps it
+        return self._df
+
+    def apply_changes(self, classifications, uids=None):
+        """Bring the in-memory frame up to date with `classifications`; `uids` limits it to changed rows."""
+        self._unsaved = True
+        if uids is None:
+            self._df = _typed(classifications_to_frame(classifications))
+            self._uid_index = None
+            self._pending = {}
+            return
+
+        df = self._frame()
+        uids = list(dict.fromkeys(uids))
+        positions = self._positions(uids)
+
+        existing = [uid for uid, position in zip(uids, positions) if position >= 0]
+        if any(uid not in classifications for uid in existing):
+            self.apply_changes(classifications)  # Removed rows (rare): rebuild
+            return
+
+        # New rows are buffered so a confirmation never copies the frame; reads append them in one go
+        for uid, position in zip(uids, positions):
+            if position < 0:
+                entry = classifications.get(uid)
+                if entry is None:
+                    self._pending.pop(uid, None)
+                else:
+                    self._pending[uid] = entry
+
+        if existing:
+            # Edits of existing rows (reclassification) are written in place
+            changed = _typed(classifications_to_frame(classifications, existing))
+            _share_categories(df, changed)
+            row_positions = self._positions(changed["UID"].tolist())
+            for column in HISTORY_COLUMNS[1:]:
+                df.iloc[row_positions, df.columns.get_loc(column)] = changed[column].to_numpy()
+
+    def _positions(self, uids):
+        """Row positions of `uids` in the frame, -1 for rows not in it."""
+        if self._uid_index is None:
+            self._uid_index = pd.Index(self._df["UID"])
+            self._appended_positions = {}
+        positions = self._uid_index.get_indexer(uids)
+        if self._appended_positions:
+            for i in np.flatnonzero(positions < 0):
+                positions[i] = self._appended_positions.get(uids[i], -1)
+        return positions
+
+    def _append_pending(self, df):
+        added = _typed(classifications_to_frame(self._pending))
+        self._pending = {}
+        _share_categories(df, added)
+        frames = [f for f in (df, added) if not f.empty]
+        self._df = pd.concat(frames, ignore_index=True) if frames else df
+        if self._uid_index is not None:
+            # Appended rows extend the index by their positions; rebuilding it costs a pass over every UID
+            start = len(self._df) - len(added)
+            self._appended_positions.update(zip(added["UID"], range(start, len(self._df))))
+        return self._df
+
+    def save(self):
+        """Write the frame to the snapshot file if it changed (call after the store's last write, at close)."""
+        if not (self.enabled and self._df is not None and self._unsaved):
+            return
+        if self.store.changed_elsewhere():
+            # The frame lacks the other process's rows; the left-over stale file is rebuilt on next load
+            logging.info("Classifications were written by another process; history snapshot not saved.")
+            return
+        self.load()  # Append pending rows first
+        self._write()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            table = feather.read_table(self.path, memory_map=True)
+        except Exception as e:
+            logging.warning(f"Could not read history snapshot {self.path}: {e}")
+            return None
+
+        metadata = table.schema.metadata or {}
+        if metadata.get(b"snapshot") != self._stamp().encode():
+            logging.info("History snapshot is stale; rebuilding from the classification store.")
+            return None
+        return table.to_pandas()
+
+    def _write(self):
+        table = pa.Table.from_pandas(self._df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"snapshot": self._stamp().encode()})
+
+        try:
+            # Uncompressed so reads can be memory-mapped without a decode step
+            with atomic_write(self.path, "wb") as f:
+                feather.write_feather(table, f, compression="uncompressed")
+            self._unsaved = False
+        except OSError as e:
+            logging.warning(f"Could not write history snapshot {self.path}: {e}")
+
+    def _stamp(self):
+        return json.dumps({"version": SNAPSHOT_FORMAT_VERSION, "source": self.store.fingerprint()})
+
+
+def _typed(df):
+    """Fix the snapshot column set and dtypes so an empty history round-trips like a full one."""
+    if df.empty:
+        df = pd.DataFrame({column: pd.Series(dtype=object) for column in HISTORY_COLUMNS})
+    df = df.reindex(columns=HISTORY_COLUMNS)
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").astype("float64")
+    # Details/Category/Source repeat heavily: dictionary-encode them (Arrow dictionary columns on disk)
+    return compact_frame(df)
+
+
+def _share_categories(df, changed):
+    """Give both frames' categorical columns the same categories so rows can be assigned or concatenated."""
+    for column in df.columns:
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            continue
+        categories = df[column].cat.categories
+        new = changed[column].cat.categories.difference(categories)
+        if len(new):
+            # Rebuilt from the codes: add_categories re-validates every existing category (100k+ descriptions)
+            categories = categories.append(new.astype(categories.dtype))
+            df[column] = pd.Categorical.from_codes(df[column].cat.codes.to_numpy(), dtype=pd.CategoricalDtype(categories))
+        changed[column] = changed[column].cat.set_categories(categories)
@@ -0,0 +1,216 @@
+# inbox_watcher.py
+#
+# Polls an inbox folder for new bank exports, auto-classifies their transactions with the
+# current model and appends them to the classification history:
+#
+#   python inbox_watcher.py                 # watch INBOX_DIR every INBOX_POLL_SECONDS
+#   python inbox_watcher.py path/to/inbox --once
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+import pandas as pd
+from config import (
+    INBOX_DIR, INBOX_STATE_FILE, INBOX_REVIEW_FILE, INBOX_POLL_SECONDS, INBOX_SETTLE_SECONDS, INGEST_EXTENSIONS,
+    STORAGE_BACKEND
+)
+from ingest import read_export, normalize_columns, amount_dtypes
+from text_normalization import add_normalized_columns
+from utils import ensure_transaction_ids, atomic_write
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class InboxWatcher:
+    """
+    Incremental ingestion of an inbox folder.
+    Per file the state records size, mtime, content hash and rows already ingested, so a poll
+    where nothing changed costs one stat() per file. A CSV that only grew (its old bytes still
+    hash the same) has just the appended rows read; a file whose content matches one already
+    processed under another name is skipped. Rows that clear AUTO_CLASSIFY_THRESHOLD are saved
+    as classifications; the rest are appended to INBOX_REVIEW_FILE for manual review.
+    """
+
+    def __init__(self, controller, inbox=INBOX_DIR, state_file=INBOX_STATE_FILE, review_file=INBOX_REVIEW_FILE):
+        self.controller = controller
+        self.inbox = inbox
+        self.state_file = state_file
+        self.review_file = review_file
+        self.state = self._load_state()
+        self._review_uids = None  # UIDs already in the review file, read on first append
+
+    def poll_once(self):
+        """Ingest whatever is new in the inbox. Returns (rows ingested, rows auto-classified)."""
+        if not os.path.isdir(self.inbox):
+            return 0, 0
+
+        frames = []
+        entries = {}  # name -> state entry, recorded once its rows are classified
+        now = time.time()
+        for name in sorted(os.listdir(self.inbox)):
+            if not name.lower().endswith(INGEST_EXTENSIONS) or name.startswith(("~$", ".")):
+                continue
+            path = os.path.join(self.inbox, name)
+            stat = os.stat(path)
+            known = self.state["files"].get(name)
+            if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            if now - stat.st_mtime < INBOX_SETTLE_SECONDS:
+                continue  # Still being written; pick it up on a later poll
+
+            try:
+                df, entries[name] = self._read_new_rows(name, path, stat, known, entries)
+            except Exception as e:
+                # Not recorded: the file is retried on the next poll
+                logging.warning(f"Inbox: could not read {name}: {e}")
+                continue
+            if df is not None and not df.empty:
+                frames.append(df)
+
+        if not frames:
+            if entries:
+                self._record(entries)
+            return 0, 0
+
+        df = add_normalized_columns(ensure_transaction_ids(pd.concat(frames, ignore_index=True)))
+        classified = self.controller.auto_classify_transactions(df)
+        if classified:
+            self.controller.save_classifications(classified)
+            self.controller.flush_classifications()
+
+        review = df[~df["UID"].isin(self.controller.classifier.classifications)]
+        if not review.empty:
+            self._append_review(review)
+
+        self._record(entries)
+        logging.info(f"Inbox: ingested {len(df)} rows, auto-classified {len(classified)}, {len(review)} left for review.")
+        return len(df), len(classified)
+
+    def run(self, interval=INBOX_POLL_SECONDS):
+        logging.info(f"Watching {self.inbox} every {interval}s. Ctrl+C to stop.")
+        try:
+            while True:
+                self.poll_once()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def _read_new_rows(self, name, path, stat, known, polled):
+        """
+        Rows of `name` not ingested yet (None for a duplicate) and the state entry to record for it.
+        `polled` holds the entries of files read earlier in the same poll.
+        """
+        digest, grown = self._hash_file(path, known)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest, "rows": 0}
+
+        if grown:
+            # Same leading bytes as last time: only the appended rows are new
+            skipped = range(1, known["rows"] + 1)
+            df = normalize_columns(pd.read_csv(path, skiprows=skipped, dtype=amount_dtypes(path)))
+            entry["rows"] = known["rows"] + len(df)
+            logging.info(f"Inbox: {name} grew by {len(df)} rows.")
+            return df, entry
+
+        original = self.state["hashes"].get(digest)
+        original_entry = self.state["files"].get(original)
+        for other, other_entry in polled.items():
+            if other_entry["sha256"] == digest:
+                original, original_entry = other, other_entry
+        if original is not None and original != name:
+            logging.info(f"Inbox: {name} duplicates {original}; skipped.")
+            entry["rows"] = (original_entry or {}).get("rows", 0)
+            return None, entry
+
+        df = read_export(path)
+        entry["rows"] = len(df)
+        logging.info(f"Inbox: new file {name} with {len(df)} rows.")
+        return df, entry
+
+    def _record(self, entries):
+        """Mark files as ingested (after their rows were classified) and save the state."""
+        for name, entry in entries.items():
+            old = self.state["files"].get(name)
+            if old and self.state["hashes"].get(old["sha256"]) == name:
+                del self.state["hashes"][old["sha256"]]
+            self.state["files"][name] = entry
+            self.state["hashes"].setdefault(entry["sha256"], name)
+        self._save_state()
+
+    @staticmethod
+    def _hash_file(path, known):
+        """
+        SHA-256 of the file in one pass. When it is a CSV that was processed at a smaller size, the
+        hash of its first `known['size']` bytes is checked on the way; a match means it only grew.
+        """
+        sha = hashlib.sha256()
+        prefix_size = known["size"] if known and path.lower().endswith(".csv") else None
+        grown = False
+        with open(path, "rb") as f:
+            if prefix_size is not None:
+                remaining = prefix_size
+                while remaining > 0:
+                    block = f.read(min(HASH_BLOCK_SIZE, remaining))
+                    if not block:
+                        break
+                    sha.update(block)
+                    remaining -= len(block)
+                grown = remaining == 0 and sha.copy().hexdigest() == known["sha256"]
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                sha.update(block)
+        return sha.hexdigest(), grown
+
+    def _append_review(self, df):
+        if self._review_uids is None:
+            exists = os.path.exists(self.review_file)
+            self._review_uids = set(pd.read_csv(self.review_file, usecols=["UID"])["UID"]) if exists else set()
+        df = df[~df["UID"].isin(self._review_uids)]
+        if df.empty:
+            return
+        self._review_uids.update(df["UID"])
+
+        directory = os.path.dirname(self.review_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        columns = [c for c in ("UID", "Date", "Details", "Amount", "Balance") if c in df.columns]
+        write_header = not os.path.exists(self.review_file)
+        df[columns].to_csv(self.review_file, mode="a", index=False, header=write_header)
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        return {"files": {}, "hashes": {}}
+
+    def _save_state(self):
+        with atomic_write(self.state_file) as f:
+            json.dump(self.state, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Auto-classify bank exports dropped into an inbox folder.")
+    parser.add_argument("inbox", nargs="?", default=INBOX_DIR)
+    parser.add_argument("--interval", type=float, default=INBOX_POLL_SECONDS, help="Seconds between polls")
+    parser.add_argument("--once", action="store_true", help="Poll a single time and exit")
+    args = parser.parse_args(argv)
+    if STORAGE_BACKEND != "sqlite":
+        # The JSON store rewrites the whole file from each process's memory: the watcher and the
+        # GUI would overwrite each other's classifications. SQLite writes only the changed rows.
+        parser.error('the inbox watcher needs STORAGE_BACKEND = "sqlite" in config.py')
+
+    from app_controller import AppController  # Deferred: loads the model and history
+    controller = AppController()
+    watcher = InboxWatcher(controller, args.inbox)
+    try:
+        if args.once:
+            watcher.poll_once()
+        else:
+            watcher.run(args.interval)
+    finally:
+        controller.close()
+
+
+if __name__ == "__main__":
+    main()
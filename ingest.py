@@ -0,0 +1,133 @@
+# ingest.py
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from config import INGEST_WORKERS, INGEST_EXTENSIONS, CLI_CHUNK_SIZE
+from utils import generate_transaction_ids
+
+EXPORT_COLUMNS = ("Date", "Details", "Amount", "Balance")
+
+
+def read_export(path):
+    """Read one bank export (CSV or XLSX) with normalized column names."""
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_excel(path)
+    return normalize_columns(df)
+
+
+def normalize_columns(df):
+    """Strip header whitespace and match the expected columns case-insensitively ('  details' -> 'Details')."""
+    canonical = {name.lower(): name for name in EXPORT_COLUMNS}
+    renamed = {}
+    for column in df.columns:
+        stripped = str(column).strip()
+        renamed[column] = canonical.get(stripped.lower(), stripped)
+    return df.rename(columns=renamed)
+
+
+def amount_dtypes(path, chunksize=CLI_CHUNK_SIZE):
+    """
+    The dtypes read_export infers for a CSV's Amount/Balance columns when it reads the whole file,
+    found by reading only those columns in chunks. Passed as read_csv(dtype=...) to a partial read
+    (a chunk, or rows appended to a file) so its values, and UIDs, match a whole-file load.
+    """
+    found = {}
+    for chunk in pd.read_csv(path, usecols=_is_amount_column, chunksize=chunksize):
+        for column, dtype in chunk.dtypes.items():
+            found.setdefault(column, []).append(dtype)
+    return {column: _whole_file_dtype(dtypes) for column, dtypes in found.items()}
+
+
+def _is_amount_column(column):
+    return str(column).strip().lower() in ("amount", "balance")
+
+
+def _whole_file_dtype(dtypes):
+    # Numbers only if every chunk parsed as numbers (else raw strings); one float chunk makes it float
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in dtypes):
+        return object
+    if any(dtype.kind == "f" for dtype in dtypes):
+        return "float64"
+    return dtypes[0]
+
+
+def _load_one(path):
+    # Runs in a worker process: parse and hash there so only the finished frame is sent back
+    start = time.perf_counter()
+    df = read_export(path)
+    df["UID"] = generate_transaction_ids(df)
+    return df, time.perf_counter() - start
+
+
+def list_exports(folder):
+    """Export files in a folder, sorted by name (monthly exports usually sort chronologically)."""
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(INGEST_EXTENSIONS) and not name.startswith(("~$", "."))
+    )
+
+
+def load_folder(folder, max_workers=INGEST_WORKERS):
+    """
+    Read every export in `folder` in a process pool and concatenate them.
+    Rows whose UID already appeared in an earlier file (overlapping statements) are dropped;
+    repeats within a single file are kept, as in a single-file load.
+    Returns (DataFrame, per-file stats) where each stat has file/rows/new_rows/seconds/error.
+    """
+    paths = list_exports(folder)
+    if not paths:
+        return pd.DataFrame(), []
+
+    start = time.perf_counter()
+    if len(paths) == 1 or max_workers == 1:
+        results = [_collect(lambda: _load_one(path), path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_load_one, path) for path in paths]
+            results = [_collect(future.result, path) for future, path in zip(futures, paths)]
+
+    frames = []
+    stats = []
+    seen = set()
+    for path, (df, seconds, error) in zip(paths, results):
+        stat = {"file": os.path.basename(path), "rows": 0, "new_rows": 0, "seconds": seconds, "error": error}
+        stats.append(stat)
+        if df is None:
+            continue
+        new = ~df["UID"].isin(seen)
+        seen.update(df["UID"])
+        stat["rows"] = len(df)
+        stat["new_rows"] = int(new.sum())
+        frames.append(df[new])
+
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    loaded = sum(s["rows"] for s in stats)
+    logging.info(
+        f"Loaded {len(combined)} transactions ({loaded - len(combined)} overlapping rows dropped) "
+        f"from {len(paths)} files in {time.perf_counter() - start:.2f}s."
+    )
+    return combined, stats
+
+
+def _collect(load, path):
+    # One unreadable export should not abort the whole folder
+    try:
+        return (*load(), None)
+    except Exception as e:
+        logging.warning(f"Could not load {path}: {e}")
+        return None, 0.0, str(e)
+
+
+def format_stats(stats):
+    lines = [f"{'File':<40} {'Rows':>8} {'New':>8} {'Seconds':>8}"]
+    for s in stats:
+        if s["error"]:
+            lines.append(f"{s['file']:<40} failed: {s['error']}")
+        else:
+            lines.append(f"{s['file']:<40} {s['rows']:>8} {s['new_rows']:>8} {s['seconds']:>8.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,179 @@
+# knn_engine.py
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from config import KNN_NEIGHBOURS, KNN_WEIGHT_POWER, KNN_CANDIDATES, KNN_SHORTLIST_GRAMS, KNN_NGRAM_RANGE, KNN_FEATURES, KNN_QUERY_CHUNK
+
+
+class CharNgramVectorizer:
+    """
+    Hashed character n-grams with sublinear TF-IDF weights, L2-normalised so a sparse dot product
+    is the cosine similarity. Hashing keeps the feature space fixed, so new descriptions can be
+    added between rebuilds; IDF weights are learned at fit time (unseen grams get the maximum IDF).
+    """
+
+    def __init__(self, ngram_range=KNN_NGRAM_RANGE, n_features=KNN_FEATURES):
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = n_features
+        self.tfidf = TfidfTransformer(sublinear_tf=True)
+
+    def _counts(self, texts):
+        return HashingVectorizer(
+            analyzer="char_wb", ngram_range=self.ngram_range, n_features=self.n_features,
+            alternate_sign=False, norm=None, dtype=np.float32
+        ).transform(texts)
+
+    def fit_transform(self, texts):
+        counts = self._counts(texts)
+        return self.tfidf.fit(counts).transform(counts).astype(np.float32)
+
+    def transform(self, texts):
+        return self.tfidf.transform(self._counts(texts)).astype(np.float32)
+
+
+class KNNClassifier:
+    """
+    Nearest-neighbour classifier over L2-normalised sparse vectors.
+    Identical training rows are stored once with per-category label counts, so a history of
+    repeated merchant strings shrinks to its distinct descriptions. A query's class scores are the
+    label shares of its k most similar descriptions weighted by similarity ** weight_power, scaled by the best
+    similarity; the rest of the probability mass follows the class prior, so a query with only
+    distant neighbours gets a low confidence. Neighbours are searched among a shortlist of rows
+    sharing the query's `shortlist_grams` most distinctive (highest weighted) n-grams, so the
+    postings of grams common to most of the history are never walked.
+    """
+
+    def __init__(self, n_neighbors=KNN_NEIGHBOURS, weight_power=KNN_WEIGHT_POWER, n_candidates=KNN_CANDIDATES,
+                 shortlist_grams=KNN_SHORTLIST_GRAMS, chunk_size=KNN_QUERY_CHUNK):
+        self.n_neighbors = n_neighbors
+        self.weight_power = weight_power
+        self.n_candidates = max(n_candidates, n_neighbors)
+        self.shortlist_grams = shortlist_grams
+        self.chunk_size = chunk_size
+        self.classes_ = np.arange(0)
+        self._row_ids = {}  # row content -> id of the stored vector
+        self._rows = None  # stored rows x features
+        self._postings = None  # features x stored rows
+        self._blocks = []  # new (rows x features) vectors not merged yet
+        self._label_counts = sparse.csr_matrix((0, 0))  # stored rows x classes
+        self._shares = None  # row-normalised label counts, rebuilt after changes
+        self._prior = np.zeros(0)
+
+    @property
+    def n_rows(self):
+        return len(self._row_ids)
+
+    @staticmethod
+    def _row_keys(X):
+        return [
+            X.indices[X.indptr[i]:X.indptr[i + 1]].tobytes() + X.data[X.indptr[i]:X.indptr[i + 1]].tobytes()
+            for i in range(X.shape[0])
+        ]
+
+    def fit(self, X, y):
+        X = sparse.csr_matrix(X, dtype=np.float32)
+        X.sort_indices()
+        y = np.asarray(y)
+        codes, keys = pd.factorize(pd.Series(self._row_keys(X), dtype=object))
+        first = np.unique(codes, return_index=True)[1]
+
+        self.classes_ = np.arange(int(y.max()) + 1 if len(y) else 0)
+        self._row_ids = {key: i for i, key in enumerate(keys)}
+        self._rows = None
+        self._blocks = [X[first]]
+        self._label_counts = sparse.csr_matrix(
+            (np.ones(len(y)), (codes, y)), shape=(len(keys), len(self.classes_))
+        )
+        self._shares = None
+        self._merged()  # Build the postings now rather than on the first prediction
+        return self
+
+    def partial_fit(self, X, y):
+        """Add labelled rows; rows identical to a stored one only add to its label counts."""
+        X = sparse.csr_matrix(X, dtype=np.float32)
+        X.sort_indices()
+        y = np.asarray(y)
+        ids, new_rows = [], []
+        for i, key in enumerate(self._row_keys(X)):
+            row_id = self._row_ids.get(key)
+            if row_id is None:
+                row_id = self._row_ids[key] = len(self._row_ids)
+                new_rows.append(i)
+            ids.append(row_id)
+        if new_rows:
+            self._blocks.append(X[new_rows])
+
+        n_classes = max(len(self.classes_), int(y.max()) + 1 if len(y) else 0)
+        self.classes_ = np.arange(n_classes)
+        counts = self._label_counts.tocsr()
+        counts.resize((self.n_rows, n_classes))
+        self._label_counts = counts + sparse.csr_matrix((np.ones(len(y)), (ids, y)), shape=counts.shape)
+        self._shares = None
+        return self
+
+    def _merged(self):
+        if self._blocks:
+            new = sparse.vstack(self._blocks).tocsr()
+            self._rows = new if self._rows is None else sparse.vstack([self._rows, new]).tocsr()
+            self._blocks = []
+            self._postings = self._rows.T.tocsr()
+        if self._shares is None or self._shares.shape[1] != len(self.classes_):
+            counts = self._label_counts.tocsr()
+            counts.resize((self.n_rows, len(self.classes_)))
+            totals = np.asarray(counts.sum(axis=1)).ravel()
+            self._shares = sparse.diags(1.0 / np.maximum(totals, 1)) @ counts
+            class_totals = np.asarray(counts.sum(axis=0)).ravel()
+            self._prior = class_totals / max(class_totals.sum(), 1)
+        return self._shares
+
+    def predict_proba(self, X):
+        shares = self._merged()
+        X = sparse.csr_matrix(X, dtype=np.float32)
+        X.sort_indices()
+        # Score each distinct query once
+        codes, _ = pd.factorize(pd.Series(self._row_keys(X), dtype=object))
+        first = np.unique(codes, return_index=True)[1]
+        queries = X[first]
+
+        probabilities = np.empty((queries.shape[0], len(self.classes_)))
+        for start in range(0, queries.shape[0], self.chunk_size):
+            chunk = queries[start:start + self.chunk_size]
+            weights, best = self._neighbours(chunk)
+            weights.data **= self.weight_power  # One close match outweighs several distant ones
+            votes = np.asarray((weights @ shares).todense())
+            totals = votes.sum(axis=1, keepdims=True)
+            votes = np.divide(votes, totals, out=np.zeros_like(votes), where=totals > 0)
+            probabilities[start:start + chunk.shape[0]] = best[:, None] * votes + (1 - best[:, None]) * self._prior
+        return probabilities[codes]
+
+    def _neighbours(self, queries):
+        """
+        The k most similar stored rows per query as (sparse weights, best similarity per row).
+        Candidates are the rows scoring best on the query's most distinctive grams; their exact
+        cosine similarity is then computed pair by pair.
+        """
+        distinctive = self._top_per_row(queries, self.shortlist_grams)
+        shortlist = self._top_per_row(distinctive @ self._postings, self.n_candidates)
+        pairs = shortlist.tocoo()
+        exact = np.asarray(queries[pairs.row].multiply(self._rows[pairs.col]).sum(axis=1)).ravel()
+        similarities = sparse.csr_matrix((exact, (pairs.row, pairs.col)), shape=shortlist.shape)
+        weights = self._top_per_row(similarities, self.n_neighbors)
+        best = np.minimum(np.asarray(weights.max(axis=1).todense()).ravel(), 1.0)
+        return weights, best
+
+    @staticmethod
+    def _top_per_row(matrix, k):
+        """Sparse matrix keeping only the k largest entries of each row."""
+        matrix = matrix.tocsr()
+        lengths = np.diff(matrix.indptr)
+        if not len(lengths) or lengths.max() <= k:
+            return matrix
+        keep = np.ones(matrix.nnz, dtype=bool)
+        for i in np.flatnonzero(lengths > k):
+            start, end = matrix.indptr[i], matrix.indptr[i + 1]
+            keep[start:end] = False
+            keep[start + np.argpartition(-matrix.data[start:end], k - 1)[:k]] = True
+        rows = np.repeat(np.arange(matrix.shape[0]), lengths)[keep]
+        return sparse.csr_matrix((matrix.data[keep], (rows, matrix.indices[keep])), shape=matrix.shape)
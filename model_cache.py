@@ -0,0 +1,91 @@
+# model_cache.py
+
+import hashlib
+import logging
+import os
+import pickle
+import numpy as np
+from scipy import sparse
+from config import IGNORED_TERMS
+from utils import atomic_write
+
+CACHE_FORMAT_VERSION = 1
+DIGEST_MODULUS = 2 ** 256
+
+
+def entry_digest(uid, entry):
+    """Hash a single manual classification into an integer so digests can be summed order-independently."""
+    key = f"{uid}|{entry.get('Description')}|{entry.get('Category')}"
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest(), "big")
+
+
+def classifications_digest(classifications):
+    """Order-independent digest of every manual classification (the model's training data)."""
+    total = 0
+    for uid, entry in classifications.items():
+        if entry.get("Source") == "manual":
+            total = (total + entry_digest(uid, entry)) % DIGEST_MODULUS
+    return total
+
+
+def training_key(digest, settings):
+    """Combine the training data digest with the cleaning/model settings that shape the artifact."""
+    parts = [
+        f"v{CACHE_FORMAT_VERSION}",
+        f"{digest:064x}",
+        "|".join(sorted(IGNORED_TERMS)),
+        repr(sorted(settings.items())),
+    ]
+    return hashlib.sha256("#".join(parts).encode("utf-8")).hexdigest()
+
+
+def save_model_artifact(filepath, key, state):
+    """
+    Pickle the fitted model state under the given key.
+    The dense per-class feature counts are stored sparse and log probabilities are
+    recomputed on load, which keeps hashed-feature artifacts small.
+    """
+    classifier = state["classifier"]
+    feature_count = getattr(classifier, "feature_count_", None)
+    feature_log_prob = getattr(classifier, "feature_log_prob_", None)
+
+    try:
+        if feature_count is not None:
+            classifier.feature_count_ = sparse.csr_matrix(feature_count)
+            del classifier.feature_log_prob_
+
+        with atomic_write(filepath, "wb") as f:
+            pickle.dump({"key": key, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logging.debug(f"Model artifact saved to {filepath}.")
+    except OSError as e:
+        logging.warning(f"Could not save model artifact: {e}")
+    finally:
+        if feature_count is not None:
+            classifier.feature_count_ = feature_count
+            classifier.feature_log_prob_ = feature_log_prob
+
+
+def load_model_artifact(filepath, key):
+    """Return the cached model state if it exists and matches the key, otherwise None."""
+    if not os.path.exists(filepath):
+        return None
+
+    try:
+        with open(filepath, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        logging.warning(f"Ignoring unreadable model artifact: {e}")
+        return None
+
+    if state.pop("key", None) != key:
+        logging.info("Model artifact is stale. Retraining.")
+        return None
+
+    classifier = state["classifier"]
+    if sparse.issparse(getattr(classifier, "feature_count_", None)):
+        classifier.feature_count_ = np.asarray(classifier.feature_count_.todense())
+        smoothed_fc = classifier.feature_count_ + classifier.alpha
+        smoothed_cc = smoothed_fc.sum(axis=1)
+        classifier.feature_log_prob_ = np.log(smoothed_fc) - np.log(smoothed_cc.reshape(-1, 1))
+
+    return state
@@ -0,0 +1,148 @@
+# perf.py
+
+import atexit
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from config import PERF_STATS_ENABLED, PERF_REPORT_FILE
+
+SAMPLE_WINDOW = 2000  # Most recent durations kept per name for percentile estimates
+
+
+class PerfStats:
+    """Call counts, latencies and rows processed for one instrumented operation."""
+
+    __slots__ = ("count", "total", "rows", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def record(self, duration, rows):
+        self.count += 1
+        self.total += duration
+        self.rows += rows
+        self.max = max(self.max, duration)
+        self.samples.append(duration)
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class PerfRegistry:
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, duration, rows=0):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = PerfStats()
+            stats.record(duration, rows)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def report(self):
+        """Per-operation summary, slowest cumulative time first."""
+        with self._lock:
+            rows = [
+                {
+                    "name": name,
+                    "calls": stats.count,
+                    "total_s": stats.total,
+                    "mean_ms": 1000 * stats.total / stats.count,
+                    "p95_ms": 1000 * stats.percentile(0.95),
+                    "max_ms": 1000 * stats.max,
+                    "rows": stats.rows,
+                }
+                for name, stats in self._stats.items()
+            ]
+        return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+    def format_report(self):
+        lines = [f"{'Operation':<48} {'Calls':>7} {'Total s':>9} {'Mean ms':>9} {'p95 ms':>9} {'Rows':>10}"]
+        for r in self.report():
+            lines.append(
+                f"{r['name']:<48} {r['calls']:>7} {r['total_s']:>9.3f} {r['mean_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['rows']:>10}"
+            )
+        return "\n".join(lines)
+
+
+registry = PerfRegistry()
+
+
+def _count_rows(rows, args, kwargs):
+    if rows is None:
+        return 0
+    try:
+        return int(rows(*args, **kwargs)) if callable(rows) else int(rows)
+    except Exception:
+        return 0
+
+
+def timed(name=None, rows=None):
+    """
+    Decorator recording call count and latency under `name` (defaults to the qualified name).
+    `rows` is an optional callable taking the wrapped function's arguments and returning how many
+    rows the call processes. When PERF_STATS_ENABLED is off the function is returned unwrapped.
+    """
+    def decorator(func):
+        if not PERF_STATS_ENABLED:
+            return func
+
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.record(label, time.perf_counter() - start, _count_rows(rows, args, kwargs))
+        return wrapper
+    return decorator
+
+
+def timer(name, rows=0):
+    """Context manager timing a block; a no-op nullcontext when instrumentation is off."""
+    if not PERF_STATS_ENABLED:
+        return nullcontext()
+    return _timer(name, rows)
+
+
+@contextmanager
+def _timer(name, rows):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.record(name, time.perf_counter() - start, rows)
+
+
+def _dump_report():
+    if not registry.report():
+        return
+    logging.info("Performance report:\n" + registry.format_report())
+    if PERF_REPORT_FILE:
+        try:
+            with open(PERF_REPORT_FILE, "w") as f:
+                json.dump(registry.report(), f, indent=2)
+        except OSError as e:
+            logging.warning(f"Could not write performance report: {e}")
+
+
+if PERF_STATS_ENABLED:
+    atexit.register(_dump_report)
@@ -0,0 +1,70 @@
+# retrain_worker.py
+
+import logging
+import threading
+
+
+class RetrainWorker:
+    """
+    Runs model updates on a background thread so the GUI never blocks on training.
+    Requests that arrive while a retrain is in flight are coalesced into a single follow-up
+    job; the classifier swaps the new model in atomically when it is ready.
+    """
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self._condition = threading.Condition()
+        self._pending_uids = set()
+        self._pending_all = False  # A request without UIDs asks for every unseen manual row
+        self._has_pending = False
+        self._busy = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="retrain-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def in_flight(self):
+        """True while a retrain is running or queued."""
+        with self._condition:
+            return self._busy or self._has_pending
+
+    def request(self, uids=None):
+        """Queue a model update for the given UIDs (or a full sweep when None)."""
+        with self._condition:
+            if uids is None:
+                self._pending_all = True
+            else:
+                self._pending_uids.update(uids)
+            self._has_pending = True
+            self._condition.notify()
+
+    def wait_idle(self, timeout=None):
+        """Block until no retrain is running or queued. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not (self._busy or self._has_pending), timeout)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._has_pending or self._stopped)
+                if self._stopped:
+                    return
+                uids = None if self._pending_all else self._pending_uids
+                self._pending_uids = set()
+                self._pending_all = False
+                self._has_pending = False
+                self._busy = True
+
+            try:
+                self.classifier.update_model(uids)
+            except Exception:
+                logging.exception("Background model update failed.")
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
@@ -0,0 +1,155 @@
+# spending_cube.py
+
+import numpy as np
+import pandas as pd
+
+CREDIT_CATEGORIES = {
+    "TF Revolving",
+    "TF Joint saving",
+    "TF Bills",
+    "TF Leon",
+    "TF Kate"
+}
+
+DATE_FORMAT = "%d/%m/%Y"  # Dates as stored in classifications and bank exports
+UNDATED = -1  # Day of rows whose date could not be parsed: counted in totals, left out of the daily frames
+
+
+def to_days(dates):
+    """Day numbers (days since 1970-01-01) for datetime-like or dd/mm/YYYY values; unparseable dates become UNDATED."""
+    dates = pd.Series(dates)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format=DATE_FORMAT, errors="coerce")
+    days = dates.dt.floor("D").to_numpy(dtype="datetime64[D]")
+    return np.where(np.isnat(days), UNDATED, days.astype(np.int64))
+
+
+def to_cents(amounts):
+    return np.round(pd.to_numeric(pd.Series(amounts), errors="coerce").to_numpy(dtype=float) * 100)
+
+
+class SpendingCube:
+    """
+    Daily totals per category (day x category cells of integer cents and transaction counts).
+    Built once from a frame of transactions, then kept current with add()/apply_changes(), so charts
+    and summaries derive their data in time proportional to the number of active days rather than
+    transactions. Cents keep repeated add/remove updates exact. Frames are materialized on demand
+    and cached until the next change; `version` increases with every change.
+    """
+
+    def __init__(self, credit_categories=CREDIT_CATEGORIES):
+        self.credit_categories = credit_categories
+        self._cells = {}  # (day, category) -> [cents, count]
+        self.version = 0
+        self._frames = None
+
+    @classmethod
+    def from_frame(cls, df, category_column="Category", **kwargs):
+        """Aggregate a frame with Date, Amount and category columns (rows without a category or amount are left out)."""
+        cube = cls(**kwargs)
+        if df is None or df.empty:
+            return cube
+        grouped = pd.DataFrame({
+            "Day": to_days(df["Date"]),
+            "Category": df[category_column].to_numpy(dtype=object),
+            "Cents": to_cents(df["Amount"]),
+        })
+        grouped = grouped[grouped["Category"].notna() & grouped["Cents"].notna()]
+        grouped = grouped.groupby(["Day", "Category"], sort=False)["Cents"].agg(["sum", "count"])
+        cube._cells = {
+            key: [int(cents), int(count)]
+            for key, cents, count in zip(grouped.index, grouped["sum"].tolist(), grouped["count"].tolist())
+        }
+        return cube
+
+    @classmethod
+    def of(cls, data):
+        """The cube itself, or a cube aggregated from a transactions frame."""
+        return data if isinstance(data, cls) else cls.from_frame(data)
+
+    def __len__(self):
+        return len(self._cells)
+
+    @property
+    def empty(self):
+        return not self._cells
+
+    def add(self, day, category, cents, count=1):
+        """Add (or with negative cents/count, remove) transactions from a day/category cell."""
+        if category is None:
+            return
+        cell = self._cells.setdefault((int(day), category), [0, 0])
+        cell[0] += int(cents)
+        cell[1] += count
+        if cell[1] <= 0:
+            del self._cells[(int(day), category)]
+        self.version += 1
+        self._frames = None
+
+    def add_entry(self, entry, sign=1):
+        """Add (sign=1) or remove (sign=-1) one classification entry."""
+        cents = to_cents([entry.get("Amount")])[0]
+        if np.isnan(cents):
+            return
+        self.add(to_days([entry.get("Date")])[0], entry.get("Category"), sign * cents, sign)
+
+    def apply_changes(self, changes):
+        """Keep the cube in step with a batch of ClassificationChange events."""
+        for c in changes:
+            if c.old is not None:
+                self.add_entry(c.old, -1)
+            self.add_entry(c.new)
+
+    # --- Derived frames (index: Date, columns: categories in sorted order) ---
+
+    def _materialize(self):
+        if self._frames is None:
+            cells = {key: value for key, value in self._cells.items() if key[0] != UNDATED}
+            if not cells:
+                empty = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+                self._frames = (empty, empty.copy())
+            else:
+                (days, categories), values = zip(*cells.keys()), np.array(list(cells.values()))
+                cells = pd.DataFrame({
+                    "Date": np.array(days, dtype="datetime64[D]").astype("datetime64[ns]"),
+                    "Category": categories, "Amount": values[:, 0] / 100, "Count": values[:, 1],
+                })
+                amounts = cells.pivot(index="Date", columns="Category", values="Amount").sort_index()
+                counts = cells.pivot(index="Date", columns="Category", values="Count").sort_index()
+                amounts = amounts.reindex(columns=sorted(amounts.columns))
+                counts = counts.reindex(columns=amounts.columns)
+                self._frames = (amounts.fillna(0.0), counts.fillna(0).astype(np.int64))
+        return self._frames
+
+    def totals(self):
+        """Signed daily totals per category, as in the bank export (one row per day with any transaction)."""
+        return self._materialize()[0]
+
+    def counts(self):
+        return self._materialize()[1]
+
+    def _split(self, credit):
+        amounts, counts = self._materialize()
+        columns = [c for c in amounts.columns if (c in self.credit_categories) == credit]
+        active = counts[columns].sum(axis=1) > 0
+        return amounts.loc[active, columns]
+
+    def spending(self):
+        """Daily spending per non-credit category as positive amounts (days with spending only)."""
+        return -self._split(credit=False)
+
+    def credit(self):
+        """Daily totals per credit category (days with credit transactions only)."""
+        return self._split(credit=True)
+
+    def category_totals(self):
+        """Category, TotalAmount and Count over all days (undated rows included), largest total first."""
+        totals = {}
+        for (_, category), (cents, count) in self._cells.items():
+            total = totals.setdefault(category, [0, 0])
+            total[0] += cents
+            total[1] += count
+        return pd.DataFrame(
+            [(category, cents / 100, count) for category, (cents, count) in totals.items()],
+            columns=["Category", "TotalAmount", "Count"]
+        ).sort_values(by="TotalAmount", ascending=False)
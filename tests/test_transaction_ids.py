@@ -0,0 +1,92 @@
+# tests/test_transaction_ids.py
+#
+# generate_transaction_ids must produce the same UIDs as the row-wise generate_transaction_id
+# (applied with df.apply(..., axis=1), as the app did), or existing classification files stop matching.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classify_cli import classify_file
+from ingest import read_export, amount_dtypes
+from utils import generate_transaction_id, generate_transaction_ids
+
+BASE = {
+    "Date": ["01/01/2024", "02/01/2024", "03/01/2024"],
+    "Details": ["TESCO STORES 123", "SHELL FUEL", "NETFLIX.COM"],
+    "Amount": [-12.5, -40.0, -9.99],
+    "Balance": [987.5, 947.5, 937.51],
+}
+
+CASES = {
+    "float amounts": {},
+    "integer amounts": {"Amount": [-12, -40, 10]},
+    "missing float amount": {"Amount": [-12.5, np.nan, -9.99]},
+    "nullable Int64 with NA": {"Amount": pd.array([-12, None, 10], dtype="Int64")},
+    "nullable Float64 with NA": {"Amount": pd.array([-12.5, None, -9.99], dtype="Float64")},
+    "object details with None": {"Details": ["TESCO STORES 123", None, "NETFLIX.COM"]},
+    "string details with NA": {"Details": pd.array(["TESCO STORES 123", None, "NETFLIX.COM"], dtype="string")},
+    "categorical details": {"Details": pd.Categorical(["TESCO", "SHELL", "TESCO"])},
+    "datetime dates with NaT": {"Date": pd.to_datetime(["2024-01-01 00:00", "2024-01-02 13:45", None])},
+    "object balance with None": {"Balance": [987.5, None, "937.51"]},
+}
+
+
+def row_wise(df):
+    return df.apply(generate_transaction_id, axis=1)
+
+
+@pytest.mark.parametrize("overrides", CASES.values(), ids=CASES.keys())
+def test_matches_row_wise_ids(overrides):
+    df = pd.DataFrame({**BASE, **overrides})
+    assert generate_transaction_ids(df).tolist() == row_wise(df).tolist()
+
+
+def test_without_balance_column():
+    df = pd.DataFrame(BASE).drop(columns="Balance")
+    assert generate_transaction_ids(df).tolist() == row_wise(df).tolist()
+
+
+def test_csv_export(tmp_path):
+    path = tmp_path / "export.csv"
+    pd.DataFrame({**BASE, "Amount": [-12.5, None, 10]}).to_csv(path, index=False)
+    df = pd.read_csv(path)
+    assert generate_transaction_ids(df).tolist() == row_wise(df).tolist()
+
+
+def test_empty_frame_keeps_index():
+    df = pd.DataFrame(columns=list(BASE))
+    assert generate_transaction_ids(df).empty
+
+
+class StoredOnly:
+    """Classifier stand-in knowing every UID of the file, so classify_file only looks them up."""
+
+    def __init__(self, classifications):
+        self.classifications = classifications
+
+
+@pytest.mark.parametrize("amounts", [
+    [-12, -40, 10, -3, 7],           # all whole: int64 for the whole file
+    [-12, -40, 10, -3.5, 7],         # float only in a later chunk
+    [-12, -40, 10, None, 7],         # missing only in a later chunk
+    [-12, -40, 10, "pending", 7],    # text only in a later chunk
+], ids=["all integer", "late float", "late missing", "late text"])
+def test_chunked_reads_match_whole_file(tmp_path, amounts):
+    path = tmp_path / "export.csv"
+    pd.DataFrame({
+        "Date": [f"0{day}/01/2024" for day in range(1, 6)],
+        "Details": ["TESCO", "SHELL", "NETFLIX", "TESCO", "SHELL"],
+        "Amount": amounts,
+        "Balance": [988, 948, 958, 955, 962],
+    }).to_csv(path, index=False)
+    whole = generate_transaction_ids(read_export(str(path))).tolist()
+
+    chunks = pd.read_csv(path, chunksize=3, dtype=amount_dtypes(path, chunksize=3))
+    assert [uid for chunk in chunks for uid in generate_transaction_ids(chunk)] == whole
+
+    # The CLI finds every row of the file already classified (none re-classified as new)
+    output = tmp_path / "classified.csv"
+    stored = {uid: {"Category": "Groceries", "Source": "manual"} for uid in whole}
+    classify_file(path, output, chunksize=3, classifier=StoredOnly(stored))
+    assert (pd.read_csv(output)["Source"] == "manual").all()
@@ -0,0 +1,60 @@
+# text_normalization.py
+
+import re
+import pandas as pd
+from config import IGNORED_TERMS
+
+# Patterns are compiled once at import rather than on every call
+IGNORED_TERMS_PATTERN = (
+    re.compile(r"\b(" + "|".join(re.escape(term) for term in sorted(IGNORED_TERMS)) + r")\b")
+    if IGNORED_TERMS else None
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+
+CLEAN_COLUMN = "CleanDetails"  # Classifier input: lowercase, ignored terms removed, whitespace collapsed
+NORMALIZED_COLUMN = "NormDetails"  # Fuzzy matching input: lowercase, punctuation removed
+
+
+def clean_description(text):
+    """Lowercase, drop IGNORED_TERMS as whole words and collapse whitespace."""
+    text = text.lower()
+    if IGNORED_TERMS_PATTERN is not None:
+        text = IGNORED_TERMS_PATTERN.sub("", text)
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def normalize_text(text):
+    """Return a lowercase, punctuation-free version of the input text."""
+    text = text.lower()
+    text = PUNCTUATION_PATTERN.sub("", text)
+    return text.strip()
+
+
+def clean_series(series):
+    """Vectorized clean_description over a Series of descriptions."""
+    series = series.astype(str).str.lower()
+    if IGNORED_TERMS_PATTERN is not None:
+        series = series.str.replace(IGNORED_TERMS_PATTERN, "", regex=True)
+    return series.str.replace(WHITESPACE_PATTERN, " ", regex=True).str.strip()
+
+
+def normalize_series(series):
+    """Vectorized normalize_text over a Series of descriptions."""
+    return series.astype(str).str.lower().str.replace(PUNCTUATION_PATTERN, "", regex=True).str.strip()
+
+
+def add_normalized_columns(df, column="Details"):
+    """
+    Cache the cleaned and normalized forms of a description column on the DataFrame.
+    Each distinct description is processed once; existing columns are left untouched.
+    """
+    if df.empty or (CLEAN_COLUMN in df.columns and NORMALIZED_COLUMN in df.columns):
+        return df
+
+    unique_details = pd.Series(df[column].dropna().unique())
+    if CLEAN_COLUMN not in df.columns:
+        df[CLEAN_COLUMN] = df[column].map(dict(zip(unique_details, clean_series(unique_details))))
+    if NORMALIZED_COLUMN not in df.columns:
+        df[NORMALIZED_COLUMN] = df[column].map(dict(zip(unique_details, normalize_series(unique_details))))
+    return df
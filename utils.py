@@ -1,25 +1,90 @@
 # utils.py
 import hashlib
-import re
 import os
 import json
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import pandas as pd
-from config import IGNORED_TERMS, CLASSIFICATION_FILE
+from config import CLASSIFICATION_FILE
+from text_normalization import clean_description  # noqa: F401  (re-exported for existing callers)
+from perf import timed
 
 
+@timed("utils.hash_transaction_id", rows=1)
 def generate_transaction_id(row):
     key = f"{row['Date']}|{row['Details']}|{row['Amount']}|{row.get('Balance', '')}"
     return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
-def clean_description(text):
-    # Lowercase
-    text = text.lower()
-    # Remove ignored terms as whole words
-    pattern = r"\b(" + "|".join(re.escape(term) for term in IGNORED_TERMS) + r")\b"
-    text = re.sub(pattern, "", text)
-    # Remove extra whitespace
-    return re.sub(r"\s+", " ", text).strip()
+@timed("utils.hash_transaction_ids", rows=lambda df: len(df))
+def generate_transaction_ids(df):
+    """
+    Vectorized generate_transaction_id over a whole DataFrame.
+    Builds the same "Date|Details|Amount|Balance" keys with column-wise string concatenation,
+    then hashes them in one pass. Produces byte-identical IDs to the row-wise function.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
 
+    parts = [_column_as_str(df[col]) for col in ("Date", "Details", "Amount")]
+    parts.append(_column_as_str(df["Balance"]) if "Balance" in df.columns else pd.Series("", index=df.index))
+    keys = parts[0].str.cat(parts[1:], sep="|")
+
+    sha256 = hashlib.sha256
+    return pd.Series([sha256(key.encode("utf-8")).hexdigest() for key in keys], index=df.index, dtype=object)
+
+
+def _column_as_str(series):
+    """Format a column the way an f-string formats each row value."""
+    if series.dtype.kind in "iufbO" or pd.api.types.is_string_dtype(series.dtype):
+        text = series.astype(str).astype(object)
+    else:
+        # Datetimes etc: astype(str) drops midnight times that str(Timestamp) keeps
+        text = series.map(str).astype(object)
+
+    # astype(str) renders missing values by dtype (NA, or 'nan' for nullable Int64/Float64);
+    # the row-wise key has str() of the value itself: 'nan', 'None', 'NaT' or '<NA>'
+    missing = series.isna().to_numpy()
+    if missing.any():
+        text[missing] = [str(value) for value in series[missing]]  # map(str) would turn masked NA into nan
+    return text
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """
+    Open a temp file next to `path` for writing; once the block completes it replaces `path` in one
+    rename, so readers never see a partial file. On error the temp file is removed and the error re-raised.
+    An existing file's permissions are kept. The temp name is unique per process and thread, so
+    concurrent writers (the GUI and the inbox watcher saving the model) do not clobber each other.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def ensure_transaction_ids(df):
+    """Add a UID column computed once per loaded frame, if it is not already present."""
+    if "UID" not in df.columns:
+        df["UID"] = generate_transaction_ids(df)
+    return df
+
+
+@timed("utils.load_classified_data")
 def load_classified_data(filepath=CLASSIFICATION_FILE):
     if not os.path.exists(filepath):
         return pd.DataFrame()
@@ -27,8 +92,19 @@ def load_classified_data(filepath=CLASSIFICATION_FILE):
     with open(filepath, "r") as f:
         data = json.load(f)
 
+    return classifications_to_frame(data)
+
+
+def classifications_to_frame(data, uids=None):
+    """Convert classification entries (UID -> entry) into the classified-history DataFrame."""
+    if uids is None:
+        uids = data.keys()
+
     rows = []
-    for uid, entry in data.items():
+    for uid in uids:
+        entry = data.get(uid)
+        if entry is None:
+            continue
         row = {
             "UID": uid,
             "Date": entry.get("Date"),
@@ -39,7 +115,52 @@ def load_classified_data(filepath=CLASSIFICATION_FILE):
         }
         rows.append(row)
 
+    if not rows:
+        return pd.DataFrame()
+
     df = pd.DataFrame(rows)
     # df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
     df["Date"] = pd.to_datetime(df["Date"], format="%d/%m/%Y", errors="coerce")
     return df.dropna(subset=["Date"])
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with hit/miss counters."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,76 @@
+# vendor_index.py
+
+from collections import Counter
+from config import VENDOR_MIN_COUNT, VENDOR_MIN_CONSISTENCY
+from text_normalization import clean_description
+
+
+class VendorIndex:
+    """
+    Exact-match memory of manually classified descriptions.
+    Maps a cleaned description to the categories it was given, so repeat merchants can be
+    classified with a dict lookup before the model is consulted.
+    """
+
+    def __init__(self, min_count=VENDOR_MIN_COUNT, min_consistency=VENDOR_MIN_CONSISTENCY):
+        self.min_count = min_count
+        self.min_consistency = min_consistency
+        self.hits = 0
+        self.misses = 0
+        self._counts = {}  # cleaned description -> Counter of categories
+        self._indexed = {}  # UID -> (cleaned description, category) currently counted
+
+    def build(self, classifications):
+        """Index every manual classification from scratch."""
+        self._counts = {}
+        self._indexed = {}
+        for uid, entry in classifications.items():
+            self.update(uid, entry)
+
+    def update(self, uid, entry):
+        """Add, relabel or drop a single classification. Only manual labels are remembered."""
+        previous = self._indexed.pop(uid, None)
+        if previous is not None:
+            cleaned, category = previous
+            counts = self._counts[cleaned]
+            counts[category] -= 1
+            if counts[category] <= 0:
+                del counts[category]
+            if not counts:
+                del self._counts[cleaned]
+
+        if entry is None or entry.get("Source") != "manual":
+            return
+
+        cleaned = clean_description(str(entry["Description"]))
+        category = entry["Category"]
+        self._counts.setdefault(cleaned, Counter())[category] += 1
+        self._indexed[uid] = (cleaned, category)
+
+    def lookup(self, cleaned, top_n=3):
+        """
+        Return [(category, share), ...] for a cleaned description when its history is
+        frequent and consistent enough, otherwise None.
+        """
+        counts = self._counts.get(cleaned)
+        if counts:
+            total = sum(counts.values())
+            ranked = counts.most_common(top_n)
+            if total >= self.min_count and ranked[0][1] / total >= self.min_consistency:
+                self.hits += 1
+                return [(category, count / total) for category, count in ranked]
+
+        self.misses += 1
+        return None
+
+    def __len__(self):
+        return len(self._counts)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "vendors": len(self._counts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
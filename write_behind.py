@@ -0,0 +1,65 @@
+# write_behind.py
+
+import logging
+from config import WRITE_BEHIND_DELAY_MS, WRITE_BEHIND_MAX_PENDING
+
+
+class WriteBehindBuffer:
+    """
+    Collects changed classification UIDs and hands them to `flush` in one batch.
+    A flush happens when the debounce timer fires (WRITE_BEHIND_DELAY_MS after the last change),
+    when too many changes are pending, or when flush() is called explicitly (group completion,
+    window close). The timer runs on `scheduler` - any object with Tk-style after/after_cancel -
+    so flushes stay on the GUI thread; without one, only the explicit and size triggers apply.
+    """
+
+    def __init__(self, flush, delay_ms=WRITE_BEHIND_DELAY_MS, max_pending=WRITE_BEHIND_MAX_PENDING, scheduler=None):
+        self._flush = flush
+        self.delay_ms = delay_ms
+        self.max_pending = max_pending
+        self.scheduler = scheduler
+        self._pending = set()
+        self._pending_all = False  # A change without UIDs; flush everything dirty
+        self._timer = None
+
+    @property
+    def pending(self):
+        return bool(self._pending) or self._pending_all
+
+    def add(self, uids=None):
+        """Record changed UIDs (None for an unspecified change) and restart the debounce timer."""
+        if uids is None:
+            self._pending_all = True
+        else:
+            self._pending.update(uids)
+
+        if len(self._pending) >= self.max_pending:
+            self.flush()
+            return
+
+        self._cancel_timer()
+        if self.scheduler is not None:
+            self._timer = self.scheduler.after(self.delay_ms, self._on_timer)
+
+    def flush(self):
+        """Write everything pending now. Returns the number of UIDs flushed."""
+        self._cancel_timer()
+        if not self.pending:
+            return 0
+
+        uids = None if self._pending_all else self._pending
+        count = len(self._pending)
+        self._pending = set()
+        self._pending_all = False
+        self._flush(uids)
+        logging.debug(f"Write-behind flushed {count} classification changes.")
+        return count
+
+    def _on_timer(self):
+        self._timer = None
+        self.flush()
+
+    def _cancel_timer(self):
+        if self._timer is not None and self.scheduler is not None:
+            self.scheduler.after_cancel(self._timer)
+        self._timer = None